@@ -1,10 +1,18 @@
 #!/usr/bin/env bash
 
+# Usage: [YEAR=2020] [REGIONS="NSW1 VIC1"] download_data.sh [DIR]
+#
+# The downloaded monthly files can be loaded as one price series by setting the environment's
+# FILEPATH to a glob pattern, e.g., "${DIR}/PRICE_AND_DEMAND_*_NSW1.csv".
+
 DIR=${1:-data/price_demand_data}
 mkdir -p ${DIR}
 
-YEAR="2020"
-for i in {01..13};do
-    link="https://aemo.com.au/aemo/data/nem/priceanddemand/PRICE_AND_DEMAND_${YEAR}${i}_NSW1.csv"
-    wget ${link} -P ${DIR}
+YEAR=${YEAR:-2020}
+REGIONS=${REGIONS:-NSW1}
+for region in ${REGIONS}; do
+    for i in {01..13};do
+        link="https://aemo.com.au/aemo/data/nem/priceanddemand/PRICE_AND_DEMAND_${YEAR}${i}_${region}.csv"
+        wget ${link} -P ${DIR}
+    done
 done
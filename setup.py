@@ -23,6 +23,7 @@ required_packages: List[str] = [
     "matplotlib",
     "pandas",
     "pandas_bokeh>=0.5.5",  # Older versions generate minor grids -> noisy chart
+    "pyarrow",
     "ray[rllib]==0.8.5",  # python 3.5 to 3.8
     "seaborn",
     "tensorflow==2.1.0",  # python 3.5 to 3.7
@@ -36,6 +37,7 @@ extras = {
     "sagemaker": ["sagemaker"],
     # See: https://stackoverflow.com/a/53706140
     "direct_s3": ["smallmatter @ git+https://github.com/aws-samples/smallmatter-package"],
+    "benchmark": ["pytest", "pytest-benchmark"],
 }
 
 all_deps = required_packages.copy()
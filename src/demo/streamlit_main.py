@@ -1,13 +1,31 @@
 import argparse
 import os
+import queue
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
 
 import pandas as pd
-import pandas_bokeh  # noqa
 import streamlit as st
 import streamlit.components.v1 as components
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+
+from energy_storage_system import agents
+from energy_storage_system.envs import SimpleBattery
+
+# Agents selectable from the CLI, by class name.
+AGENTS = {
+    cls.__name__: cls
+    for cls in (
+        agents.RandomAgent,
+        agents.PriceVsCostAgent,
+        agents.MovingAveragePriceAgent,
+        agents.StreamingMovingAveragePriceAgent,
+    )
+}
 
 
 def display_battery(st_batt_text, st_batt, percentage: int = 50):
@@ -157,24 +175,79 @@ def display_metrics_table(st_metrics, *args):
     )
 
 
-def display_price(st_price, curr_df):
-    fig1 = curr_df.plot_bokeh(
-        show_figure=False,
-        figsize=(400, 200),
-        legend="top_left",
-        title="Market Electric Price vs Average Energy Cost",
-    )
-    st_price.bokeh_chart(fig1, use_container_width=True)
+class LiveCharts:
+    """Persistent Bokeh charts of the demo, which grow by one step at a time.
 
+    The charts are backed by `ColumnDataSource`, and each step is appended with
+    `ColumnDataSource.stream()` which also drops the points older than a rolling window. Hence,
+    the cost to update and to (re-)render a chart stays constant, regardless of the number of
+    steps replayed so far.
+    """
 
-def display_rewards(st_rewards, df):
-    fig2 = df.plot_bokeh(
-        show_figure=False,
-        figsize=(550, 200),
-        legend="top_left",
-        title="Accumlated rewards (RL vs Baseline)",
-    )
-    st_rewards.bokeh_chart(fig2, use_container_width=False)
+    def __init__(self, window: int = 500):
+        """Initialize a `LiveCharts` instance.
+
+        Args:
+            window (int, optional): number of most recent steps to show. Defaults to 500.
+        """
+        self.window = window
+        self.price_source = ColumnDataSource(data={"step": [], "price": [], "cost": []})
+        self.rewards_source = ColumnDataSource(data={"step": [], "rl": [], "baseline": []})
+
+        self.price_fig = figure(
+            plot_width=400,
+            plot_height=200,
+            title="Market Electric Price vs Average Energy Cost",
+        )
+        self.price_fig.line("step", "price", source=self.price_source, legend_label="price")
+        self.price_fig.line(
+            "step", "cost", source=self.price_source, legend_label="cost", color="orange"
+        )
+        self.price_fig.legend.location = "top_left"
+
+        self.rewards_fig = figure(
+            plot_width=550,
+            plot_height=200,
+            title="Accumlated rewards (RL vs Baseline)",
+        )
+        self.rewards_fig.line("step", "rl", source=self.rewards_source, legend_label="RL")
+        self.rewards_fig.line(
+            "step", "baseline", source=self.rewards_source, legend_label="Baseline", color="orange"
+        )
+        self.rewards_fig.legend.location = "top_left"
+
+    def stream(
+        self,
+        step: Sequence[int],
+        price: Sequence[float],
+        cost: Sequence[float],
+        reward: Sequence[float],
+        baseline_reward: Sequence[float],
+    ) -> None:
+        """Append steps to the charts.
+
+        Args:
+            step (Sequence[int]): the new steps.
+            price (Sequence[float]): market electric price of each new step.
+            cost (Sequence[float]): average energy cost of each new step.
+            reward (Sequence[float]): total reward of the RL agent at each new step.
+            baseline_reward (Sequence[float]): total reward of the baseline agent at each new step.
+        """
+        self.price_source.stream(
+            {"step": list(step), "price": list(price), "cost": list(cost)}, rollover=self.window
+        )
+        self.rewards_source.stream(
+            {"step": list(step), "rl": list(reward), "baseline": list(baseline_reward)},
+            rollover=self.window,
+        )
+
+
+def display_price(st_price, charts: LiveCharts):
+    st_price.bokeh_chart(charts.price_fig, use_container_width=True)
+
+
+def display_rewards(st_rewards, charts: LiveCharts):
+    st_rewards.bokeh_chart(charts.rewards_fig, use_container_width=False)
 
 
 def display_time(st):
@@ -203,6 +276,12 @@ def load_hist_data(filepath: str = "data/result_hist_price_agent.csv"):
     return df
 
 
+@st.cache(allow_output_mutation=True)
+def load_prices(filepath: Optional[str] = None) -> pd.DataFrame:
+    env_config = {} if filepath is None else {"FILEPATH": filepath}
+    return SimpleBattery(env_config).df_price
+
+
 def display_html_file(filename: str = "data/analysis.html"):
     f = open(filename, "r", encoding="utf-8")
     source_code = f.read()
@@ -212,16 +291,114 @@ def display_html_file(filename: str = "data/analysis.html"):
     )
 
 
+class Step(NamedTuple):
+    """A simulated step, which has the same fields as the rows of the replayed results."""
+
+    Index: int
+    price: float
+    cost: float
+    energy: float
+    action: int
+    total_reward: float
+    baseline_reward: float
+
+
+class Simulator(threading.Thread):
+    """Run an agent and a baseline agent on the same episodes, in a background thread.
+
+    Steps are put into a bounded queue, which blocks the simulation whenever the queue is full.
+    Hence, the simulation runs at its own pace, yet never more than ``maxsize`` steps ahead of
+    the consumer.
+    """
+
+    def __init__(
+        self,
+        env_config: Dict[str, Any],
+        agent: Any,
+        baseline: Any,
+        df_price: Optional[pd.DataFrame] = None,
+        maxsize: int = 1000,
+        step_seconds: float = 0.0,
+    ):
+        """Initialize a `Simulator` instance.
+
+        Args:
+            env_config (Dict[str, Any]): environment configuration.
+            agent (Any): an `agents.Agent`, or any policy with a ``compute_action(state)`` method,
+                e.g., a restored RLlib trainer.
+            baseline (Any): the agent to compare against.
+            df_price (Optional[pd.DataFrame], optional): an already-loaded price series. Defaults
+                to None.
+            maxsize (int, optional): capacity of the step queue. Defaults to 1000.
+            step_seconds (float, optional): minimum wall time of a step. Defaults to 0.0, i.e., as
+                fast as the consumer drains the queue.
+        """
+        super().__init__(daemon=True)
+        self.env = SimpleBattery(dict(env_config), df_price=df_price)
+        self.baseline_env = SimpleBattery(dict(env_config), df_price=self.env.df_price)
+        self.agent = agent
+        self.baseline = baseline
+        self.queue: "queue.Queue[Step]" = queue.Queue(maxsize)
+        self.step_seconds = step_seconds
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        """Ask the simulation to stop, at the latest after its current step."""
+        self._stopping.set()
+
+    def run(self) -> None:
+        index = 0
+        while not self._stopping.is_set():
+            state = self.env.reset()
+            baseline_state = self.baseline_env.reset(self.env.index)
+            for agent in (self.agent, self.baseline):
+                if isinstance(agent, agents.Agent):
+                    agent.reset()
+            total_reward = baseline_reward = 0.0
+            done = False
+
+            while not done and not self._stopping.is_set():
+                action = self.agent.compute_action(state)
+                baseline_action = self.baseline.compute_action(baseline_state)
+                next_state, reward, done, _ = self.env.step(action)
+                baseline_state, r, _, _ = self.baseline_env.step(baseline_action)
+                total_reward += reward
+                baseline_reward += r
+                energy, cost, price = state[:3]
+                self._put(Step(index, price, cost, energy, action, total_reward, baseline_reward))
+                state = next_state
+                index += 1
+                if self.step_seconds > 0:
+                    self._stopping.wait(self.step_seconds)
+
+    def _put(self, step: Step) -> None:
+        # Block while the queue is full, but remain stoppable.
+        while not self._stopping.is_set():
+            try:
+                self.queue.put(step, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def drain(self) -> List[Step]:
+        """Take all the steps that are currently queued, without blocking."""
+        steps = []
+        for _ in range(self.queue.maxsize):
+            try:
+                steps.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return steps
+
+
 #######################
 # HMI
 #######################
 
 
-def main(input_dir: Path, update_seconds: float = 0.5):
+def setup_page():
+    """Lay out the page, and return its placeholders."""
     st.set_page_config(layout="wide")
-    df = load_dqn_data(input_dir / "result_dqn.csv")
-    df_pvc = load_hist_data(input_dir / "result_hist_price_agent.csv")
-
     st.header("Energy Storage Demo")
     st.markdown("***")
     st.text("")
@@ -239,35 +416,106 @@ def main(input_dir: Path, update_seconds: float = 0.5):
     )
     st_rewards = st.empty()
     st_metrics = st.empty()
+    display_arrow(arrow1)
+    display_arrow(arrow2)
+    return st_price, st_act_text, st_act, st_batt_text, st_batt, st_rewards, st_metrics
+
+
+def display_step(placeholders, charts: LiveCharts, row):
+    """Update the page with the latest step, ``row``, whose fields are those of :class:`Step`."""
+    st_price, st_act_text, st_act, st_batt_text, st_batt, st_rewards, st_metrics = placeholders
+    metrics = (
+        int(row.price),
+        int(row.cost),
+        int(row.energy),
+        int(row.action),
+        int(row.total_reward),
+    )
+
+    display_price(st_price, charts)
+    display_action(st_act_text, st_act, int(row.action))
+    display_battery(st_batt_text, st_batt, int(int(row.energy) / 80 * 100))
+    display_rewards(st_rewards, charts)
+    display_metrics_table(st_metrics, *metrics)
+
+
+def main(input_dir: Path, update_seconds: float = 0.5, window: int = 500):
+    """Replay the exploitation results under ``input_dir``."""
+    # set_page_config() must be the first Streamlit command, even before a cached loader.
+    placeholders = setup_page()
+    df = load_dqn_data(input_dir / "result_dqn.csv")
+    df_pvc = load_hist_data(input_dir / "result_hist_price_agent.csv")
 
-    for index in range(100, df.shape[0] - 1, 1):
-        curr_df = df.iloc[:index]
-        curr_pvc_dr = df_pvc.iloc[:index]
-        print(curr_df.shape)
-        curr_price = int(curr_df.iloc[-1]["price"])
-        curr_cost = int(curr_df.iloc[-1]["cost"])
-        curr_energy = int(curr_df.iloc[-1]["energy"])
-        curr_action = int(curr_df.iloc[-1]["action"])
-        curr_total_reward = int(curr_df.iloc[-1]["total_reward"])
-        curr_energy_pct = int(curr_energy / 80 * 100)
-        metrics = (curr_price, curr_cost, curr_energy, curr_action, curr_total_reward)
-
-        display_price(st_price, curr_df[["price", "cost"]])
-        display_arrow(arrow1)
-        display_action(st_act_text, st_act, curr_action)
-        display_arrow(arrow2)
-        display_battery(st_batt_text, st_batt, curr_energy_pct)
-
-        df_acc_rewards = pd.DataFrame(
-            {"RL": curr_df["total_reward"], "Baseline": curr_pvc_dr["total_reward"]}
+    # Start with the first 100 steps on the charts, then replay the remaining steps one by one.
+    start, stop = 99, df.shape[0] - 2
+    charts = LiveCharts(window)
+    head, pvc_head = (
+        df.iloc[max(0, start - window) : start],
+        df_pvc.iloc[max(0, start - window) : start],
+    )
+    charts.stream(
+        head.index, head["price"], head["cost"], head["total_reward"], pvc_head["total_reward"]
+    )
+
+    next_update = time.monotonic()
+    rows = zip(df.iloc[start:stop].itertuples(), df_pvc.iloc[start:stop].itertuples())
+    for row, pvc_row in rows:
+        charts.stream(
+            [row.Index], [row.price], [row.cost], [row.total_reward], [pvc_row.total_reward]
         )
-        display_rewards(st_rewards, df_acc_rewards)
-        display_metrics_table(st_metrics, *metrics)
-        time.sleep(update_seconds)
+        display_step(placeholders, charts, row)
+
+        # Keep a steady refresh rate, regardless of the time spent on rendering.
+        next_update += update_seconds
+        time.sleep(max(0.0, next_update - time.monotonic()))
 
     st.markdown("***")
 
 
+def main_live(
+    agent: str,
+    baseline: str = "MovingAveragePriceAgent",
+    price_file: Optional[str] = None,
+    update_seconds: float = 0.5,
+    step_seconds: float = 0.0,
+    window: int = 500,
+):
+    """Simulate an agent against a baseline, and render the steps as they come."""
+    # set_page_config() must be the first Streamlit command, even before a cached loader.
+    placeholders = setup_page()
+    simulator = Simulator(
+        {} if price_file is None else {"FILEPATH": price_file},
+        AGENTS[agent](),
+        AGENTS[baseline](),
+        df_price=load_prices(price_file),
+        maxsize=window,
+        step_seconds=step_seconds,
+    )
+    charts = LiveCharts(window)
+
+    simulator.start()
+    try:
+        next_update = time.monotonic()
+        while simulator.is_alive():
+            # Render all the steps simulated since the previous update at once.
+            steps = simulator.drain()
+            if steps:
+                charts.stream(
+                    [step.Index for step in steps],
+                    [step.price for step in steps],
+                    [step.cost for step in steps],
+                    [step.total_reward for step in steps],
+                    [step.baseline_reward for step in steps],
+                )
+                display_step(placeholders, charts, steps[-1])
+
+            next_update = max(next_update + update_seconds, time.monotonic())
+            time.sleep(max(0.0, next_update - time.monotonic()))
+    finally:
+        # Streamlit interrupts this script on rerun, so never leave the simulation behind.
+        simulator.stop()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -285,6 +533,41 @@ if __name__ == "__main__":
         default=1,
         help="Update charts for every specified seconds in float (default: 1).",
     )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=int,
+        default=500,
+        help="Number of most recent steps shown on the charts (default: 500).",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Simulate the agents on the fly, instead of replaying the results under INPUT_DIR.",
+    )
+    parser.add_argument(
+        "--agent",
+        choices=list(AGENTS),
+        default="PriceVsCostAgent",
+        help="Agent to simulate in live mode (default: PriceVsCostAgent).",
+    )
+    parser.add_argument(
+        "--baseline",
+        choices=list(AGENTS),
+        default="MovingAveragePriceAgent",
+        help="Baseline agent to simulate in live mode (default: MovingAveragePriceAgent).",
+    )
+    parser.add_argument(
+        "--price-file",
+        default=None,
+        help="Price csv of live mode (default: the environment's default).",
+    )
+    parser.add_argument(
+        "--step-seconds",
+        type=float,
+        default=0.0,
+        help="Minimum seconds per simulated step in live mode (default: 0, i.e., no throttling).",
+    )
 
     # https://github.com/streamlit/streamlit/issues/337#issuecomment-544860528
     try:
@@ -295,4 +578,14 @@ if __name__ == "__main__":
         # so we have to do a hard exit.
         os._exit(e.code)
 
-    main(args.input_dir, args.update_seconds)
+    if args.live:
+        main_live(
+            args.agent,
+            args.baseline,
+            args.price_file,
+            args.update_seconds,
+            args.step_seconds,
+            args.window,
+        )
+    else:
+        main(args.input_dir, args.update_seconds, args.window)
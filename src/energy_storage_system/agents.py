@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 import numpy as np
 
@@ -10,6 +11,23 @@ class Agent(ABC):
     def compute_action(self, state) -> int:
         pass
 
+    def reset(self) -> None:
+        """Clear the agent's state at the start of an episode. Stateless agents do nothing."""
+
+    def compute_actions(self, states: np.ndarray) -> np.ndarray:
+        """Compute the actions of a batch of observations.
+
+        Sub-classes should override this with a vectorized implementation. The default one calls
+        :meth:`compute_action` on each observation in turn.
+
+        Args:
+            states (np.ndarray): observations, one per row.
+
+        Returns:
+            np.ndarray: actions, one per observation.
+        """
+        return np.array([self.compute_action(state) for state in states], dtype=np.int64)
+
 
 class RandomAgent(Agent):
     """Random agent."""
@@ -19,6 +37,9 @@ class RandomAgent(Agent):
     def compute_action(self, state) -> int:
         return np.random.choice(self.actions)
 
+    def compute_actions(self, states: np.ndarray) -> np.ndarray:
+        return np.random.choice(self.actions, size=len(states))
+
 
 class PriceVsCostAgent(Agent):
     """What should be the initial initial energy costs?
@@ -40,6 +61,16 @@ class PriceVsCostAgent(Agent):
 
         return action
 
+    def compute_actions(self, states: np.ndarray) -> np.ndarray:
+        electric_price = states[:, 2]
+        electric_cost = states[:, 1]
+
+        return np.select(
+            [electric_price > electric_cost, electric_price < electric_cost],
+            [SimpleBattery.DISCHARGE, SimpleBattery.CHARGE],
+            SimpleBattery.HOLD,
+        )
+
 
 class MovingAveragePriceAgent(Agent):
     """
@@ -64,3 +95,112 @@ class MovingAveragePriceAgent(Agent):
             action = SimpleBattery.HOLD
 
         return action
+
+    def compute_actions(self, states: np.ndarray) -> np.ndarray:
+        market_price = states[:, 2]
+        window = states[:, -self.days :]
+        # Add up column-by-column, to round exactly like the built-in sum() of compute_action().
+        total = np.zeros(window.shape[0])
+        for j in range(window.shape[1]):
+            total = total + window[:, j]
+        past_average_price = total / window.shape[1]
+
+        return np.select(
+            [market_price > past_average_price, market_price < past_average_price],
+            [SimpleBattery.DISCHARGE, SimpleBattery.CHARGE],
+            SimpleBattery.HOLD,
+        )
+
+
+class StreamingMovingAveragePriceAgent(Agent):
+    """Moving-average agent over an arbitrarily long window of past prices.
+
+    Buy: market price < average of past prices
+    Sell: market price > average of past prices
+
+    Unlike :class:`MovingAveragePriceAgent`, the window is not limited to the historical prices in
+    the observation. The agent remembers the market prices it has seen since :meth:`reset`, and
+    maintains a running sum over the last ``window`` of them (or an exponential moving average when
+    ``alpha`` is given), so each step costs O(1) regardless of the window length. The first
+    observation of an episode seeds the window with its historical prices.
+
+    The agent keeps one state per row of the batch passed to :meth:`compute_actions`, hence it can
+    also drive a :class:`~energy_storage_system.envs.VectorSimpleBattery` whose batteries run in
+    lockstep.
+    """
+
+    def __init__(self, window: int = 168, alpha: Optional[float] = None) -> None:
+        """Create a streaming moving-average agent.
+
+        Args:
+            window (int, optional): number of past prices to average. Defaults to 168 (7 days of
+                hourly prices).
+            alpha (Optional[float], optional): smoothing factor in (0, 1] of an exponential moving
+                average, which then replaces the simple moving average over ``window``. Defaults to
+                None.
+        """
+        if window < 1:
+            raise ValueError(f"Window must be > 0, but getting {window}")
+        if alpha is not None and not 0 < alpha <= 1:
+            raise ValueError(f"Alpha must be in (0, 1], but getting {alpha}")
+        self.window = window
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self) -> None:
+        # Ring buffer of the past prices (one row per battery), and its running sum.
+        self._buffer: Optional[np.ndarray] = None
+        self._sum: Optional[np.ndarray] = None
+        self._pos = 0
+        self._count = 0
+        self._ema: Optional[np.ndarray] = None
+
+    def compute_action(self, state) -> int:
+        return int(self.compute_actions(np.asarray(state, dtype=np.float64)[None, :])[0])
+
+    def compute_actions(self, states: np.ndarray) -> np.ndarray:
+        market_price = states[:, 2]
+        if self._buffer is None:
+            self._start(states)
+        elif len(states) != len(self._buffer):
+            raise ValueError(
+                f"Expecting a batch of {len(self._buffer)} states, got {len(states)}. "
+                "Call reset() before starting new episodes."
+            )
+
+        if self.alpha is not None:
+            past_average_price = market_price if self._ema is None else self._ema
+        elif self._count > 0:
+            past_average_price = self._sum / self._count
+        else:
+            past_average_price = market_price
+
+        actions = np.select(
+            [market_price > past_average_price, market_price < past_average_price],
+            [SimpleBattery.DISCHARGE, SimpleBattery.CHARGE],
+            SimpleBattery.HOLD,
+        )
+        self._push(market_price)
+        return actions
+
+    def _start(self, states: np.ndarray) -> None:
+        """Seed the window with the historical prices of the first observations of an episode."""
+        self._buffer = np.zeros((len(states), self.window), dtype=np.float64)
+        self._sum = np.zeros(len(states), dtype=np.float64)
+        # Historical prices are the most recent first.
+        for j in range(states.shape[1] - 1, 2, -1):
+            self._push(states[:, j])
+
+    def _push(self, price: np.ndarray) -> None:
+        """Append a price to the window, evicting the oldest one when the window is full."""
+        if self.alpha is not None:
+            self._ema = (
+                price.copy() if self._ema is None else self._ema + self.alpha * (price - self._ema)
+            )
+            return
+
+        # Empty slots are zeros, so the running sum is right before the window fills up.
+        self._sum += price - self._buffer[:, self._pos]
+        self._buffer[:, self._pos] = price
+        self._pos = (self._pos + 1) % self.window
+        self._count = min(self._count + 1, self.window)
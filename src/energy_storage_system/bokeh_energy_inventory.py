@@ -1,8 +1,10 @@
 import argparse
 import warnings
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Union
 
 import bokeh as bk
+import numpy as np
 import pandas as pd
 import pandas_bokeh  # noqa
 
@@ -14,23 +16,56 @@ except ImportError:
     )
     from pathlib import Path
 
-from .utils import Report, ReportIO
+from .utils import ReportIO
 
 
-def load_energy_inventories(input_dir: Path) -> pd.DataFrame:
-    """Load energy inventory levels of all reports under ``input_dir/``."""
-    dfs = []
-    for report_dir in input_dir.iterdir():
-        try:
-            report: Report = ReportIO(report_dir).load()
-            ser = report.df_history["energy"]
-            ser.rename(report_dir.name, inplace=True)
-            dfs.append(ser)
-        except Exception:
-            # Skip non-reports files or dirs, such as .DS_Store etc.
-            print("Skipping", report_dir)
+def load_energy_inventories(input_dir: Path, max_workers: Optional[int] = None) -> pd.DataFrame:
+    """Load energy inventory levels of all reports under ``input_dir/``.
 
-    return pd.concat(dfs, axis=1)
+    Reports are read concurrently, and only their ``energy`` column. Entries which are not reports,
+    such as .DS_Store etc., are skipped with a reason.
+
+    Args:
+        input_dir (Path): directory whose sub-directories are reports.
+        max_workers (Optional[int], optional): number of reader threads. Defaults to None, i.e.,
+            the `ThreadPoolExecutor` default.
+
+    Returns:
+        pd.DataFrame: one column per report, named after its directory, in name order. Shorter
+        histories are padded with NaN.
+    """
+    report_dirs = sorted(input_dir.iterdir(), key=lambda p: p.name)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_load_energy, report_dirs))
+
+    names, energies = [], []
+    for report_dir, result in zip(report_dirs, results):
+        if isinstance(result, str):
+            print(f"Skipping {report_dir}: {result}")
+            continue
+        names.append(report_dir.name)
+        energies.append(result)
+    if not energies:
+        raise ValueError(f"No reports under {input_dir}")
+
+    # Fill one preallocated block, rather than concatenating the series.
+    arr = np.full((max(len(energy) for energy in energies), len(energies)), np.nan)
+    for i, energy in enumerate(energies):
+        arr[: len(energy), i] = energy
+    return pd.DataFrame(arr, columns=names)
+
+
+def _load_energy(report_dir: Path) -> Union[np.ndarray, str]:
+    """Energy inventory levels of a report, or the reason why ``report_dir`` is not a report."""
+    if not report_dir.is_dir():
+        return "not a directory"
+    try:
+        df = ReportIO(report_dir).load_history(["energy"])
+    except FileNotFoundError:
+        return "no training history"
+    except (KeyError, ValueError) as e:
+        return f"cannot read the energy column: {e}"
+    return df["energy"].to_numpy(dtype=np.float64)
 
 
 def to_html(df: pd.DataFrame, output_dir: Path, figsize: Tuple[int, int] = (1280, 240), **kwargs):
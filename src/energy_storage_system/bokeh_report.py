@@ -1,6 +1,7 @@
 import argparse
 import warnings
-from typing import Sequence, Tuple
+from functools import partial
+from typing import Optional, Sequence, Tuple
 
 import bokeh as bk
 import pandas as pd
@@ -16,7 +17,8 @@ except ImportError:
     )
     from pathlib import Path
 
-from .utils import Report, ReportIO
+from .envs import SimpleBattery
+from .utils import ANALYSIS_COLUMNS, Report, ReportIO, bucket_counts, downsample_minmax
 
 
 # Rewards chart.
@@ -56,25 +58,42 @@ def plot_rewards(rewards_list: Sequence[float], **kwargs) -> bk.models.plots.Plo
     return plot
 
 
-def plot_analysis(df: pd.DataFrame, **kwargs) -> bk.models.plots.Plot:
+def plot_analysis(
+    df: pd.DataFrame, max_points: Optional[int] = 2000, **kwargs
+) -> bk.models.plots.Plot:
     """Plot the interactive evaluation charts of an episode.
 
+    Long histories are downsampled to at most ``max_points`` points per chart (see
+    :func:`energy_storage_system.utils.plot_analysis`), which bounds the size of the html.
+
     Args:
-        df (pd.DataFrame): training history.
+        df (pd.DataFrame): training history, e.g., of selected episodes to see every step.
+        max_points (Optional[int], optional): maximum number of points per chart. Defaults to
+            2000. None to plot every step.
         kwargs: additional ``kwargs`` to `pandas_bokeh.plot_bokeh()`.
 
     Returns:
         bk.models.plots.Plot: the plot.
     """
     kwargs = dict(**kwargs, show_figure=False)
+    if max_points is None or len(df) <= max_points:
+        plot_action = df[["action"]].plot_bokeh(kind="scatter", title="Actions Taken", **kwargs)
+    else:
+        counts = bucket_counts(df["action"], max_points)
+        counts = counts.rename(columns=SimpleBattery.ACTION_NAMES)
+        plot_action = counts.plot_bokeh(kind="line", title="Actions Taken (count)", **kwargs)
+
+    downsample = partial(downsample_minmax, max_points=max_points)
     plots = [
-        df[["average_energy_cost", "market_electric_price"]].plot_bokeh(
+        downsample(df[["average_energy_cost", "market_electric_price"]]).plot_bokeh(
             kind="line", title="Cost vs Price", **kwargs
         ),  # TODO: off tooltip on all-but-one line.
-        df[["action"]].plot_bokeh(kind="scatter", title="Actions Taken", **kwargs),
-        df[["reward"]].plot_bokeh(kind="line", title="Rewards", **kwargs),
-        df[["total_reward"]].plot_bokeh(kind="line", title="Total Reward", **kwargs),
-        df[["energy"]].plot_bokeh(kind="line", title="Energy (Inventory Level)", **kwargs),
+        plot_action,
+        downsample(df[["reward"]]).plot_bokeh(kind="line", title="Rewards", **kwargs),
+        downsample(df[["total_reward"]]).plot_bokeh(kind="line", title="Total Reward", **kwargs),
+        downsample(df[["energy"]]).plot_bokeh(
+            kind="line", title="Energy (Inventory Level)", **kwargs
+        ),
     ]
     return plots
 
@@ -129,7 +148,7 @@ def to_html(report: Report, output_dir: Path, figsize: Tuple[int, int] = (1280,
 
 def main(input_dir, output_dir):
     """CLI functionality."""
-    report = ReportIO(input_dir).load()
+    report = ReportIO(input_dir).load(columns=ANALYSIS_COLUMNS)
     output_dir.mkdir(parents=True, exist_ok=True)
     to_html(report, output_dir)
 
@@ -5,17 +5,17 @@
 
 """
 
-import io
 import logging
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-import boto3
 import gym
 import numpy as np
 import pandas as pd
-from gym.spaces import Box, Discrete
+from gym.spaces import Box, Discrete, MultiDiscrete
+
+from . import prices
 
 logging.basicConfig(
     level=logging.INFO,
@@ -48,12 +48,27 @@ class SimpleBattery(gym.Env):
     """
 
     PI = 3.14159
+    START_SCHEDULES = ("random", "sweep", "stratified")
     # Actions
     CHARGE = 0
     DISCHARGE = 1
     HOLD = 2
-
-    def __init__(self, env_config: Dict):
+    ACTION_NAMES = {CHARGE: "charge", DISCHARGE: "discharge", HOLD: "hold"}
+
+    def __init__(self, env_config: Dict, df_price: Optional[pd.DataFrame] = None):
+        """Initialize a `SimpleBattery` instance.
+
+        Args:
+            env_config (Dict): environment configuration, which is updated in-place with defaults.
+            df_price (Optional[pd.DataFrame], optional): an already-loaded price series (e.g., the
+                ``df_price`` of another environment) to use instead of loading one from
+                ``env_config``. Defaults to None.
+
+        Note:
+            ``OBS_BUFFER=True`` must not be used with RLlib. Its sampler (as of the pinned
+            ray[rllib]==0.8.5) keeps the returned observations by reference until it builds a
+            sample batch, so every row of the batch would end up holding the last observation.
+        """
         # Capacity: Min energy storage level (MWh)
         self.ENERGY_MIN = 0.0
         # Capacity: Max energy storage level (MWh), battery capacity
@@ -74,9 +89,28 @@ class SimpleBattery(gym.Env):
         self.HIST_PRICE_HORIZON = 5
         # Each trajectories is one week (168h)
         self.MAX_STEPS_PER_EPISODE = 168
+        # Return observations as a preallocated np.ndarray, overwritten by every reset()/step().
+        # Not for RLlib, whose sampler keeps observations by reference (see __init__).
+        self.OBS_BUFFER = False
+        # Seed of the environment's own random generator (None to use the global np.random)
+        self.SEED = None
+        # Episode start indexes: "random", "sweep" (every valid index in order), or "stratified"
+        # (consecutive episodes which cover the price history once, the last one overlapping its
+        # predecessor to reach the end of the history)
+        self.START_SCHEDULE = "random"
 
         self.LOCAL = None
         self.FILEPATH = None
+        # Preprocessing of raw prices: resampling frequency, and outlier threshold ($/MWh)
+        self.RESAMPLE_RULE = "1h"
+        self.MAX_PRICE = 100.0
+        # Cache of preprocessed prices (None to disable)
+        self.PRICE_CACHE_DIR = None
+        # NEM region to keep, when FILEPATH spans many regions (None to keep all rows)
+        self.REGION = None
+        # Price file on Amazon S3, when LOCAL is False
+        self.S3_BUCKET = None
+        self.S3_KEY = None
 
         # Default environment configuration. which will be added to env_config
         config_defaults = {
@@ -90,8 +124,17 @@ class SimpleBattery(gym.Env):
             "EFF": 1.0,
             "HIST_PRICE_HORIZON": 5,
             "MAX_STEPS_PER_EPISODE": 168,
+            "OBS_BUFFER": False,
+            "SEED": None,
+            "START_SCHEDULE": "random",
             "FILEPATH": DATA,
             "LOCAL": True,
+            "RESAMPLE_RULE": "1h",
+            "MAX_PRICE": 100.0,
+            "PRICE_CACHE_DIR": prices.PRICE_CACHE_DIR,
+            "REGION": None,
+            "S3_BUCKET": "demo-rl",
+            "S3_KEY": "battery/PRICE_AND_DEMAND_202103_NSW1.csv",
         }
 
         # Add new environment config passed in as params
@@ -103,13 +146,30 @@ class SimpleBattery(gym.Env):
             self.__dict__[key] = new_val
             if key not in env_config:
                 env_config[key] = new_val
+        self.env_config = env_config
 
         # Load energy price ($/MWh)
-        if self.LOCAL:
+        if df_price is not None:
+            self.df_price = df_price
+        elif self.LOCAL:
             self.df_price = self._get_data(self.FILEPATH)
         else:
             self.df_price = self._get_data_s3()
-        self.price_length = self.df_price.shape[0]
+        # Contiguous price buffer, so that reset() and step() avoid pandas indexing.
+        self.prices = np.ascontiguousarray(self.df_price["price"].to_numpy(dtype=np.float64))
+        self.price_length = self.prices.shape[0]
+
+        # Episode start indexes
+        if self.START_SCHEDULE not in self.START_SCHEDULES:
+            raise ValueError(
+                f"START_SCHEDULE must be one of {self.START_SCHEDULES}, "
+                f"but getting {self.START_SCHEDULE}"
+            )
+        self._rng: Optional[np.random.Generator] = None
+        self._schedule = self._start_schedule()
+        self._schedule_pos = 0
+        if self.SEED is not None:
+            self.seed(self.SEED)
 
         # TODO Create features
         # self.df_price["time"] = self.df_price["time"]
@@ -127,6 +187,13 @@ class SimpleBattery(gym.Env):
         )
         self.initialized = False
 
+        # Opt-in: write observations into one preallocated array, instead of a new list per step.
+        # The same array is returned by every reset() and step(), so consumers that retain
+        # observations across steps must copy them.
+        self._obs: Optional[np.ndarray] = None
+        if self.OBS_BUFFER:
+            self._obs = np.empty(self.observation_space.shape, dtype=self.observation_space.dtype)
+
     def _get_data(self, fullpath):
         """Return price series."""
         if os.getenv("SM_HOSTS") is not None:
@@ -135,54 +202,118 @@ class SimpleBattery(gym.Env):
             print("Runing on SageMaker:")
             print(f"Loading data from: {fullpath}")
 
-        df = pd.read_csv(fullpath)
-        df["SETTLEMENTDATE"] = pd.to_datetime(df["SETTLEMENTDATE"])  # type:ignore
-        df = df.resample("1h", on="SETTLEMENTDATE").mean()
-        df = df.reset_index(drop=False)
-        df = df.rename(columns={"TOTALDEMAND": "demand", "RRP": "price", "SETTLEMENTDATE": "time"})
-        # Remove outlier (> $100)
-        df = df[df["price"] <= 100]
+        df = prices.load_many(
+            fullpath,
+            self.RESAMPLE_RULE,
+            self.MAX_PRICE,
+            cache_dir=self.PRICE_CACHE_DIR,
+            region=self.REGION,
+        )
         print(f"Data size: {df.shape}")
         return df
 
     def _get_data_s3(self):
         """Return price series."""
-
-        def _read_s3_file_csv(bucket, key, header=None, usecols=None, index_col=None):
-            s3_client = boto3.client("s3")
-            response = s3_client.get_object(Bucket=bucket, Key=key)
-            response_body = response["Body"].read()
-            df = pd.read_csv(
-                io.BytesIO(response_body),
-                header=header,
-                delimiter=",",
-                low_memory=False,
-                # encoding="iso-8859-1",
-                usecols=usecols,
-                index_col=index_col,
-            )
-            return df
-
-        print("Read from S3...")
-        df = _read_s3_file_csv(
-            bucket="demo-rl", key="battery/PRICE_AND_DEMAND_202103_NSW1.csv", header=0
+        print(f"Read from S3: s3://{self.S3_BUCKET}/{self.S3_KEY}")
+        df = prices.load_s3(
+            self.S3_BUCKET,
+            self.S3_KEY,
+            self.RESAMPLE_RULE,
+            self.MAX_PRICE,
+            cache_dir=self.PRICE_CACHE_DIR,
+            region=self.REGION,
         )
-        df["SETTLEMENTDATE"] = pd.to_datetime(df["SETTLEMENTDATE"])  # type:ignore
-        df = df.resample("1h", on="SETTLEMENTDATE").mean()
-        df = df.reset_index(drop=False)
-        df = df.rename(columns={"TOTALDEMAND": "demand", "RRP": "price", "SETTLEMENTDATE": "time"})
-        # Remove outlier (> $100)
-        df = df[df["price"] <= 100]
         print(f"Data size: {df.shape}")
         return df
 
-    def reset(self):
+    def seed(self, seed: Optional[int] = None) -> List[Optional[int]]:
+        """Seed the environment's own random generator, and restart the start-index schedule.
+
+        Until this is called (or ``env_config["SEED"]`` is set), random start indexes are drawn
+        from the global ``np.random``.
+
+        Args:
+            seed (Optional[int], optional): the seed. Defaults to None, i.e., fresh entropy.
+
+        Returns:
+            List[Optional[int]]: the seed.
+        """
+        self._rng = np.random.default_rng(seed)
+        self._schedule_pos = 0
+        return [seed]
+
+    def _start_schedule(self) -> Optional[np.ndarray]:
+        """Start indexes of the deterministic schedule, or None for random starts."""
+        if self.START_SCHEDULE == "random":
+            return None
+        stride = 1 if self.START_SCHEDULE == "sweep" else self.MAX_STEPS_PER_EPISODE
+        low, high = 0 + self.HIST_PRICE_HORIZON, self.price_length - self.MAX_STEPS_PER_EPISODE
+        if high <= low:
+            raise ValueError(
+                f"START_SCHEDULE={self.START_SCHEDULE} needs more than "
+                f"HIST_PRICE_HORIZON + MAX_STEPS_PER_EPISODE prices, but getting "
+                f"{self.price_length}"
+            )
+        schedule = np.arange(low, high, stride)
+        if schedule[-1] != high - 1:
+            # Also cover the tail after the last full stride.
+            schedule = np.append(schedule, high - 1)
+        return schedule
+
+    @property
+    def num_scheduled_starts(self) -> Optional[int]:
+        """Number of episodes in one pass of the start-index schedule (None when random)."""
+        return None if self._schedule is None else len(self._schedule)
+
+    def _sample_start_index(self) -> int:
+        """Draw the start index of a new episode."""
+        if self._schedule is not None:
+            index = self._schedule[self._schedule_pos % len(self._schedule)]
+            self._schedule_pos += 1
+            return int(index)
+
+        low, high = 0 + self.HIST_PRICE_HORIZON, self.price_length - self.MAX_STEPS_PER_EPISODE
+        if self._rng is not None:
+            return int(self._rng.integers(low, high))
+        return np.random.randint(low, high)
+
+    def _get_state(self) -> Union[List, np.ndarray]:
+        """Return the observation at the current index: energy, cost, price, historical prices."""
+        start = self.index - self.HIST_PRICE_HORIZON
+        if self._obs is not None:
+            self._obs[0] = self.energy_level
+            self._obs[1] = self.cost
+            self._obs[2] = self.prices[self.index]
+            self._obs[3:] = self.prices[start : self.index][::-1]
+            return self._obs
+
+        historical_price: List = self.prices[start : self.index][::-1].tolist()
+        state: List = [self.energy_level, self.cost, self.prices[self.index]]
+        return state + historical_price
+
+    def reset(self, start_index: Optional[int] = None):
+        """Start a new episode.
+
+        Args:
+            start_index (Optional[int], optional): index of the first price of the episode, which
+                must be in ``[HIST_PRICE_HORIZON, len(prices) - MAX_STEPS_PER_EPISODE)``. Defaults
+                to None, i.e., the next start index of ``START_SCHEDULE``.
+
+        Returns:
+            Union[List, np.ndarray]: the first observation.
+        """
         # initial energy (MWh)
         self.energy_level = self.STARTING_ENERGY
         # Initial step, start from 0+hist_horizon, a random t-horizon
-        self.index = np.random.randint(
-            0 + self.HIST_PRICE_HORIZON, self.price_length - self.MAX_STEPS_PER_EPISODE
-        )
+        if start_index is None:
+            self.index = self._sample_start_index()
+        else:
+            low, high = 0 + self.HIST_PRICE_HORIZON, self.price_length - self.MAX_STEPS_PER_EPISODE
+            if not low <= start_index < high:
+                raise ValueError(
+                    f"Start index must be in [{low}, {high}), but getting {start_index}"
+                )
+            self.index = int(start_index)
 
         # Reward ($): price diff ($/MWh) * discharge energy (MWh) + fixed cost
         self.reward = 0.0
@@ -190,17 +321,7 @@ class SimpleBattery(gym.Env):
         self.cost = 40.0
         self.counter = 1
 
-        historical_price: List = (
-            self.df_price["price"]
-            .iloc[self.index - self.HIST_PRICE_HORIZON : self.index][::-1]
-            .to_list()
-        )
-        state: List = [
-            self.energy_level,
-            self.cost,
-            self.df_price["price"].iloc[self.index],
-        ]
-        state = state + historical_price
+        state = self._get_state()
 
         # logging.info("Initial setting:")
         # logging.info(
@@ -212,6 +333,7 @@ class SimpleBattery(gym.Env):
 
     def step(self, action: int):
         assert self.initialized, "Environmet is not initialized"
+        price = self.prices[self.index]
         # Sell
         if action == self.DISCHARGE:
             discharge_pwr = min(
@@ -225,8 +347,7 @@ class SimpleBattery(gym.Env):
             discharge_cost = self.BETA * discharge_pwr
             # Dependant on current price in market ($/MWh * MWh)
             reward = (
-                (self.df_price["price"].iloc[self.index] * self.EFF - self.cost)
-                * (discharge_pwr * self.DURATION)
+                (price * self.EFF - self.cost) * (discharge_pwr * self.DURATION)
             ) - discharge_cost
 
         # Buy
@@ -236,7 +357,7 @@ class SimpleBattery(gym.Env):
             )
             # Cost only change during charging ($/MWh) = total cost (current+new) / total energy (current+new)
             total_energy_cost = (self.cost * self.energy_level) + (
-                self.df_price["price"].iloc[self.index] * charge_pwr * self.DURATION / self.EFF
+                price * charge_pwr * self.DURATION / self.EFF
             )
             total_energy = self.energy_level + charge_pwr * self.DURATION
             self.cost = total_energy_cost / total_energy
@@ -256,17 +377,7 @@ class SimpleBattery(gym.Env):
             assert False, "Invalid action"
 
         # Include historical price in state
-        historical_price: List = (
-            self.df_price["price"]
-            .iloc[self.index - self.HIST_PRICE_HORIZON : self.index][::-1]
-            .to_list()
-        )
-        state: List = [
-            self.energy_level,
-            self.cost,
-            self.df_price["price"].iloc[self.index],
-        ]
-        state = state + historical_price
+        state = self._get_state()
 
         # One trajectories or episode has MAX_T hours
         if self.counter >= self.MAX_STEPS_PER_EPISODE:
@@ -282,6 +393,156 @@ class SimpleBattery(gym.Env):
         return state, reward, done, info
 
 
+class VectorSimpleBattery:
+    """A batch of independent :class:`SimpleBattery` that share one price series.
+
+    The configuration, prices and start-index sampling come from a scalar :class:`SimpleBattery`.
+    The state of all ``num_envs`` batteries (energy level, cost, index and counter) is held in
+    NumPy arrays, so that :meth:`step` applies the charge, discharge and hold arithmetic of
+    :meth:`SimpleBattery.step` to the whole batch at once. Observations, actions and rewards are
+    batched along the first axis. Batteries are auto-reset when their episode is done, in which
+    case the returned observation is the first one of the new episode.
+
+    Under the same ``np.random`` seed, battery ``i`` reproduces exactly the episodes of the
+    ``i``-th of ``num_envs`` scalar environments which are stepped (and reset) in lockstep.
+    """
+
+    def __init__(self, env: SimpleBattery, num_envs: int = 1, auto_reset: bool = True):
+        """Initialize a `VectorSimpleBattery` instance.
+
+        Args:
+            env (SimpleBattery): battery environment, which provides the configuration, the prices
+                and the start indexes of new episodes.
+            num_envs (int, optional): number of batteries. Defaults to 1.
+            auto_reset (bool, optional): set to ``False`` to leave finished batteries as they are,
+                e.g., when running exactly one episode per battery. Defaults to True.
+        """
+        if num_envs < 1:
+            raise ValueError(f"Number of environments must be > 0, but getting {num_envs}")
+        self.env = env
+        self.num_envs = num_envs
+        self.auto_reset = auto_reset
+        self.action_space = MultiDiscrete(np.full(num_envs, len(env.ACTION_NAMES)))
+        self.observation_space = Box(
+            -np.inf, np.inf, shape=(num_envs, 3 + env.HIST_PRICE_HORIZON), dtype=np.float64
+        )
+        self.initialized = False
+
+        self.energy_level = np.empty(num_envs, dtype=np.float64)
+        self.cost = np.empty(num_envs, dtype=np.float64)
+        self.index = np.empty(num_envs, dtype=np.int64)
+        self.counter = np.empty(num_envs, dtype=np.int64)
+        # Lags of the historical prices, relative to the current index.
+        self._hist_lags = np.arange(1, env.HIST_PRICE_HORIZON + 1)
+
+    def _reset_batteries(
+        self, mask: np.ndarray, start_indexes: Optional[np.ndarray] = None
+    ) -> None:
+        """Start a new episode for the batteries selected by the boolean ``mask``."""
+        self.energy_level[mask] = self.env.STARTING_ENERGY
+        if start_indexes is None:
+            self.index[mask] = [self.env._sample_start_index() for _ in range(mask.sum())]
+        else:
+            self.index[mask] = start_indexes
+        self.cost[mask] = 40.0
+        self.counter[mask] = 1
+
+    def _get_states(self) -> np.ndarray:
+        """Return the stacked observations at the current indexes."""
+        states = np.empty((self.num_envs, 3 + self.env.HIST_PRICE_HORIZON), dtype=np.float64)
+        states[:, 0] = self.energy_level
+        states[:, 1] = self.cost
+        states[:, 2] = self.env.prices[self.index]
+        states[:, 3:] = self.env.prices[self.index[:, None] - self._hist_lags]
+        return states
+
+    def reset(self, start_indexes: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Start a new episode for every battery.
+
+        Args:
+            start_indexes (Optional[Sequence[int]], optional): index of the first price of the
+                episode of each battery, same as ``start_index`` of :meth:`SimpleBattery.reset`.
+                Defaults to None, i.e., the next start indexes of ``START_SCHEDULE``.
+
+        Returns:
+            np.ndarray: the first observations, of shape ``observation_space.shape``.
+        """
+        starts = None
+        if start_indexes is not None:
+            starts = np.asarray(start_indexes, dtype=np.int64)
+            if starts.shape != (self.num_envs,):
+                raise ValueError(
+                    f"Expecting start indexes of shape ({self.num_envs},), got {starts.shape}"
+                )
+            low = self.env.HIST_PRICE_HORIZON
+            high = self.env.price_length - self.env.MAX_STEPS_PER_EPISODE
+            if ((starts < low) | (starts >= high)).any():
+                raise ValueError(f"Start indexes must be in [{low}, {high})")
+        self._reset_batteries(np.ones(self.num_envs, dtype=bool), starts)
+        self.initialized = True
+
+        return self._get_states()
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+        """Apply one action to each battery.
+
+        Args:
+            actions (np.ndarray): the action of each battery, of shape ``(num_envs,)``.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]: the observations, rewards and done
+            flags of the batteries, and an empty info.
+        """
+        assert self.initialized, "Environmet is not initialized"
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expecting actions of shape ({self.num_envs},), got {actions.shape}")
+        env = self.env
+        assert np.isin(actions, (env.CHARGE, env.DISCHARGE, env.HOLD)).all(), "Invalid action"
+
+        price = env.prices[self.index]
+        # Hold: no change in energy level and zero reward.
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+
+        # Sell
+        sell = actions == env.DISCHARGE
+        energy_level, cost = self.energy_level[sell], self.cost[sell]
+        discharge_pwr = np.minimum(
+            env.MAX_DISCHARGE_PWR, (energy_level - env.ENERGY_MIN) / env.DURATION
+        )
+        self.energy_level[sell] = energy_level - discharge_pwr * env.DURATION
+        discharge_cost = env.BETA * discharge_pwr
+        rewards[sell] = (
+            (price[sell] * env.EFF - cost) * (discharge_pwr * env.DURATION)
+        ) - discharge_cost
+
+        # Buy
+        buy = actions == env.CHARGE
+        energy_level, cost = self.energy_level[buy], self.cost[buy]
+        charge_pwr = np.minimum(env.MAX_CHARGE_PWR, (env.ENERGY_MAX - energy_level) / env.DURATION)
+        total_energy_cost = (cost * energy_level) + (
+            price[buy] * charge_pwr * env.DURATION / env.EFF
+        )
+        total_energy = energy_level + charge_pwr * env.DURATION
+        self.cost[buy] = total_energy_cost / total_energy
+        self.energy_level[buy] = energy_level + charge_pwr * env.DURATION
+        charge_cost = env.BETA * charge_pwr
+        rewards[buy] = -1 * charge_cost
+
+        states = self._get_states()
+        dones = self.counter >= env.MAX_STEPS_PER_EPISODE
+        info: Dict = {}
+
+        self.index += 1
+        self.counter += 1
+
+        if self.auto_reset and dones.any():
+            self._reset_batteries(dones)
+            states[dones] = self._get_states()[dones]
+
+        return states, rewards, dones, info
+
+
 if __name__ == "__main__":
     env_config = {"MAX_STEPS_PER_EPISODE": 5, "LOCAL": True}
     env = SimpleBattery(env_config)
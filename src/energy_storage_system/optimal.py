@@ -0,0 +1,299 @@
+"""Perfect-foresight arbitrage baseline, solved by dynamic programming over energy levels."""
+
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .envs import SimpleBattery
+
+
+class PerfectForesightResult:
+    """Perfect-foresight schedules of episodes, and upper bounds of their total rewards."""
+
+    def __init__(
+        self,
+        start_indexes: np.ndarray,
+        rewards: np.ndarray,
+        actions: np.ndarray,
+        upper_bounds: np.ndarray,
+    ) -> None:
+        """Initialize a `PerfectForesightResult` instance.
+
+        Args:
+            start_indexes (np.ndarray): start index of each episode.
+            rewards (np.ndarray): total reward of each episode under ``actions``, a lower bound of
+                the optimum.
+            actions (np.ndarray): actions of each episode, of shape ``(episodes, steps)``.
+            upper_bounds (np.ndarray): upper bound of the total reward of each episode, or NaN.
+        """
+        self.start_indexes = start_indexes
+        self.rewards = rewards
+        self.actions = actions
+        self.upper_bounds = upper_bounds
+
+    @property
+    def mean_rewards(self) -> float:
+        """Mean of episodes's total rewards, i.e., of the returned (feasible) schedules."""
+        return float(self.rewards.mean())
+
+    @property
+    def mean_upper_bounds(self) -> float:
+        """Mean of episodes's upper bounds, which no policy can exceed."""
+        return float(self.upper_bounds.mean())
+
+
+def solve_perfect_foresight(
+    env: SimpleBattery,
+    start_indexes: Optional[Sequence[int]] = None,
+    levels: Optional[int] = None,
+    labels: int = 2,
+    chunk_size: int = 512,
+) -> PerfectForesightResult:
+    """Find the best charge/discharge/hold schedule of episodes, knowing all their prices upfront.
+
+    The energy level between ``ENERGY_MIN`` and ``ENERGY_MAX`` is discretized into ``levels``
+    evenly-spaced levels, and each of the ``MAX_STEPS_PER_EPISODE`` steps is a transition between
+    levels that uses the reward and weighted-average cost arithmetic of :meth:`SimpleBattery.step`.
+    All episodes of a chunk of ``start_indexes`` are solved at once, as NumPy operations over
+    ``(chunk_size, labels, levels)`` arrays.
+
+    The reward of a discharge depends on the average energy cost, hence on the charging history,
+    so the state of a path is more than its energy level. Its total reward at the end of an
+    episode is ``reward + a * value + future``, where ``reward`` is its cumulative reward so far,
+    ``value = cost * energy`` is the book value of its energy, ``future`` does not depend on the
+    path so far, and ``a`` in [0, 1] is the fraction of ``value`` that remains unsold at the end.
+    Hence, each level keeps up to ``labels`` paths, the ones with the best
+    ``reward - (1 - a) * value`` for ``a`` evenly spaced in [0, 1]. Consequently:
+
+    * the returned actions are feasible, and their total reward is exactly the one that
+      :class:`SimpleBattery` pays for them, as long as the charge and discharge steps land on the
+      grid. The default ``levels`` guarantees this whenever possible, e.g., 2 MWh apart for the
+      default configuration.
+    * the total reward is a lower bound of the true optimum. It may be missed when the best path
+      is dominated, at some step, by the ``labels`` paths which are kept at its energy level.
+      More labels make it less likely, at a quadratic cost.
+
+    To judge a policy against, each episode also gets an upper bound of the total reward that any
+    action sequence can earn. It relaxes the book value of the energy left at the end, ``a = 1``,
+    to ``max(40, max price / EFF) * energy``: the average cost is a weighted average of the initial
+    cost and of the charge prices, so it can never be higher. The remaining objective only depends
+    on the energy level, hence is solved exactly over the grid. The bound is valid when every
+    charge and discharge lands on the grid, otherwise it is NaN. It is loose when the bound of the
+    final average cost is far above the actual one, e.g., in episodes with price spikes.
+
+    Args:
+        env (SimpleBattery): battery environment, which provides the configuration and prices.
+        start_indexes (Optional[Sequence[int]], optional): start index of each episode. Defaults to
+            None, which is every valid start index of ``env``.
+        levels (Optional[int], optional): number of energy levels. Defaults to None, which is the
+            coarsest grid where every charge and discharge lands exactly, or 81 levels when there
+            is no such grid of at most 1001 levels.
+        labels (int, optional): number of paths kept at each energy level. Defaults to 2.
+        chunk_size (int, optional): number of episodes solved at once. Defaults to 512.
+
+    Returns:
+        PerfectForesightResult: start index, total reward, actions, and upper bound of each
+        episode.
+    """
+    if levels is None:
+        levels = _exact_levels(env)
+    if levels < 2:
+        raise ValueError(f"Levels must be > 1, but getting {levels}")
+    if labels < 1:
+        raise ValueError(f"Labels must be > 0, but getting {labels}")
+    low, high = env.HIST_PRICE_HORIZON, env.price_length - env.MAX_STEPS_PER_EPISODE
+    starts = np.asarray(
+        np.arange(low, high) if start_indexes is None else start_indexes, dtype=np.int64
+    )
+    if ((starts < low) | (starts >= high)).any():
+        raise ValueError(f"Start indexes must be in [{low}, {high})")
+
+    rewards = np.empty(len(starts), dtype=np.float64)
+    upper_bounds = np.full(len(starts), np.nan)
+    actions = np.empty((len(starts), env.MAX_STEPS_PER_EPISODE), dtype=np.int64)
+    transitions = _Transitions(env, levels)
+    for i in range(0, len(starts), chunk_size):
+        chunk = slice(i, i + chunk_size)
+        rewards[chunk], actions[chunk] = _solve_chunk(
+            env, transitions, starts[chunk], np.linspace(0.0, 1.0, labels)
+        )
+        if transitions.exact:
+            upper_bounds[chunk] = _upper_bound_chunk(env, transitions, starts[chunk])
+
+    return PerfectForesightResult(starts, rewards, actions, upper_bounds)
+
+
+def _exact_levels(env: SimpleBattery, max_levels: int = 1001, default: int = 81) -> int:
+    """Count the levels of the coarsest grid which contains every reachable energy level."""
+    # Energy steps, in micro-MWh.
+    steps = [
+        env.ENERGY_MAX - env.ENERGY_MIN,
+        env.STARTING_ENERGY - env.ENERGY_MIN,
+        env.MAX_CHARGE_PWR * env.DURATION,
+        env.MAX_DISCHARGE_PWR * env.DURATION,
+    ]
+    units = [round(step * 1e6) for step in steps]
+    if any(abs(unit - step * 1e6) > 1e-3 for unit, step in zip(units, steps)) or units[0] <= 0:
+        return default
+
+    gcd = 0
+    for unit in units:
+        gcd = math.gcd(gcd, unit)
+    levels = units[0] // gcd + 1
+    return levels if levels <= max_levels else default
+
+
+class _Transitions:
+    """Energy grid, and the level reached by each action from each level."""
+
+    # Candidate actions, in the order of the action codes.
+    ACTIONS = np.array([SimpleBattery.CHARGE, SimpleBattery.DISCHARGE, SimpleBattery.HOLD])
+
+    def __init__(self, env: SimpleBattery, levels: int) -> None:
+        self.energy = np.linspace(env.ENERGY_MIN, env.ENERGY_MAX, levels)
+        self.charge_pwr = np.minimum(
+            env.MAX_CHARGE_PWR, (env.ENERGY_MAX - self.energy) / env.DURATION
+        )
+        self.discharge_pwr = np.minimum(
+            env.MAX_DISCHARGE_PWR, (self.energy - env.ENERGY_MIN) / env.DURATION
+        )
+        self.start = self._nearest(np.array([env.STARTING_ENERGY]))[0]
+
+        # Level reached by each (action, level), flattened action-major.
+        targets = np.concatenate(
+            [
+                self.energy + self.charge_pwr * env.DURATION,
+                self.energy - self.discharge_pwr * env.DURATION,
+                self.energy,
+            ]
+        )
+        destinations = self._nearest(targets)
+        # Whether every transition, and the starting energy, lands exactly on the grid.
+        tol = 1e-9 * max(1.0, env.ENERGY_MAX - env.ENERGY_MIN)
+        self.exact = bool(
+            np.abs(self.energy[destinations] - targets).max() <= tol
+            and abs(self.energy[self.start] - env.STARTING_ENERGY) <= tol
+        )
+        # Candidates of each level, padded with the index of a dummy, never-feasible candidate.
+        counts = np.bincount(destinations, minlength=levels)
+        order = np.argsort(destinations, kind="stable")
+        self.dummy = len(destinations)
+        self.candidates = np.full((levels, counts.max()), self.dummy, dtype=np.int64)
+        rank = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.candidates[destinations[order], rank] = order
+
+    def _nearest(self, energy: np.ndarray) -> np.ndarray:
+        step = self.energy[1] - self.energy[0]
+        index = np.rint((energy - self.energy[0]) / step).astype(np.int64)
+        return np.clip(index, 0, len(self.energy) - 1)
+
+
+def _solve_chunk(
+    env: SimpleBattery, transitions: _Transitions, start_indexes: np.ndarray, alphas: np.ndarray
+):
+    """Forward DP and backtracking of a chunk of episodes."""
+    n, levels, labels = len(start_indexes), len(transitions.energy), len(alphas)
+    steps, slots = env.MAX_STEPS_PER_EPISODE, transitions.candidates.shape[1]
+    energy = transitions.energy
+    charge_pwr = transitions.charge_pwr
+    discharge_pwr = transitions.discharge_pwr
+    # Energy level after each candidate transition, and the dummy's, whose book value is zero.
+    candidate_energy = np.concatenate(
+        [energy + charge_pwr * env.DURATION, energy - discharge_pwr * env.DURATION, energy, [0.0]]
+    )[transitions.candidates]
+    weights = (1 - alphas)[:, None]
+    dummy = (np.full((n, labels, 1), -np.inf), np.zeros((n, labels, 1)))
+
+    # Paths kept at each level: cumulative reward and average energy cost.
+    total = np.full((n, labels, levels), -np.inf)
+    total[:, :, transitions.start] = 0.0
+    cost = np.full((n, labels, levels), 40.0)
+    # Backpointers: previous label and candidate slot of each path, as label * slots + slot.
+    backpointers = np.empty((steps, n, labels, levels), dtype=np.min_scalar_type(labels * slots))
+
+    for t in range(steps):
+        price = env.prices[start_indexes + t][:, None, None]
+
+        # Buy: cost only change during charging.
+        total_energy_cost = (cost * energy) + (price * charge_pwr * env.DURATION / env.EFF)
+        total_energy = energy + charge_pwr * env.DURATION
+        with np.errstate(invalid="ignore", divide="ignore"):
+            charge_cost = total_energy_cost / total_energy
+        charge_total = total + (-1 * (env.BETA * charge_pwr))
+
+        # Sell
+        discharge_reward = (
+            (price * env.EFF - cost) * (discharge_pwr * env.DURATION)
+        ) - env.BETA * discharge_pwr
+        discharge_total = total + discharge_reward
+
+        # Hold: zero reward, and no change in energy level or cost.
+        candidate_total = np.concatenate([charge_total, discharge_total, total, dummy[0]], axis=2)
+        candidate_cost = np.concatenate([charge_cost, cost, cost, dummy[1]], axis=2)
+        gathered_total = candidate_total[:, :, transitions.candidates]
+        gathered_cost = candidate_cost[:, :, transitions.candidates]
+
+        # Best candidate of each level, for each weight of the book value. Looping over the few
+        # (label, slot) pairs is much faster than an argmax over a short trailing axis.
+        best_score = np.full((n, labels, levels), -np.inf)
+        total = np.full((n, labels, levels), -np.inf)
+        cost = np.full((n, labels, levels), 40.0)
+        choice = backpointers[t]
+        choice.fill(0)
+        for label in range(labels):
+            for slot in range(slots):
+                path_total = gathered_total[:, label, None, :, slot]
+                path_cost = gathered_cost[:, label, None, :, slot]
+                score = path_total - weights * (path_cost * candidate_energy[:, slot])
+                better = score > best_score
+                np.copyto(best_score, score, where=better)
+                np.copyto(total, path_total, where=better)
+                np.copyto(cost, path_cost, where=better)
+                np.copyto(choice, label * slots + slot, where=better, casting="unsafe")
+
+    # Backtrack from the path with the best total reward.
+    rows = np.arange(n)
+    best = total.reshape(n, -1).argmax(axis=1)
+    rewards = total.reshape(n, -1)[rows, best]
+    label, level = np.divmod(best, levels)
+    actions = np.empty((n, steps), dtype=np.int64)
+    for t in range(steps - 1, -1, -1):
+        label, slot = np.divmod(backpointers[t][rows, label, level].astype(np.int64), slots)
+        candidate = transitions.candidates[level, slot]
+        actions[:, t] = transitions.ACTIONS[candidate // levels]
+        level = candidate % levels
+
+    return rewards, actions
+
+
+def _upper_bound_chunk(
+    env: SimpleBattery, transitions: _Transitions, start_indexes: np.ndarray
+) -> np.ndarray:
+    """Exact DP over energy levels of the relaxed objective, for a chunk of episodes.
+
+    The total reward of a path telescopes into ``sum(sales) - sum(purchases) - sum(wear)
+    - cost0 * energy0 + cost * energy``, where the last term is the book value at the end.
+    """
+    n, levels = len(start_indexes), len(transitions.energy)
+    energy = transitions.energy
+    charged = transitions.charge_pwr * env.DURATION
+    discharged = transitions.discharge_pwr * env.DURATION
+    dummy = np.full((n, 1), -np.inf)
+
+    value = np.full((n, levels), -np.inf)
+    value[:, transitions.start] = 0.0
+    for t in range(env.MAX_STEPS_PER_EPISODE):
+        price = env.prices[start_indexes + t][:, None]
+        charge_value = value - price * charged / env.EFF - env.BETA * transitions.charge_pwr
+        discharge_value = (
+            value + price * env.EFF * discharged - env.BETA * transitions.discharge_pwr
+        )
+        candidate_value = np.concatenate([charge_value, discharge_value, value, dummy], axis=1)
+        value = candidate_value[:, transitions.candidates].max(axis=2)
+
+    # Episode prices, to bound the average cost at the end.
+    window = start_indexes[:, None] + np.arange(env.MAX_STEPS_PER_EPISODE)
+    max_cost = np.maximum(40.0, env.prices[window].max(axis=1) / env.EFF)
+    value = value + max_cost[:, None] * energy - 40.0 * energy[transitions.start]
+    return value.max(axis=1)
@@ -0,0 +1,427 @@
+"""Load electricity price series, with an on-disk cache of the preprocessed series.
+
+A price series comes from one or many raw AEMO price-and-demand files (e.g., one per month), which
+are preprocessed in parallel, then concatenated into one hourly, time-ordered series.
+
+Files on Amazon S3 are downloaded once per node: the local copy is keyed by the object's ETag, and
+all environments of a process share one S3 client.
+
+Raw AEMO price-and-demand files are 5-minute .csv files. Parsing, resampling and filtering them
+is by far the slowest part of constructing an environment, so the preprocessed series is cached
+as one memory-mappable ``.npy`` file per column. A sidecar ``meta.json`` records the size, mtime
+and sha256 of the source file, plus the preprocessing parameters, so that a cache entry is rebuilt
+automatically whenever the source file or the parameters change. It also records the NEM regions of
+the source file, so that checking them does not re-read the file.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import boto3
+import numpy as np
+import pandas as pd
+
+# Bump when the preprocessing or the cache layout changes, to invalidate existing caches.
+CACHE_VERSION = 2
+
+PRICE_CACHE_DIR = (
+    Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "energy_storage_system" / "prices"
+)
+
+_COLUMNS = ("time", "demand", "price")
+
+
+def preprocess(
+    df: pd.DataFrame,
+    resample_rule: str = "1h",
+    max_price: float = 100.0,
+    region: Optional[str] = None,
+) -> pd.DataFrame:
+    """Resample a raw AEMO price-and-demand dataframe, and remove outliers.
+
+    Args:
+        df (pd.DataFrame): raw dataframe with columns ``SETTLEMENTDATE``, ``TOTALDEMAND`` and
+            ``RRP``.
+        resample_rule (str, optional): resampling frequency. Defaults to "1h".
+        max_price (float, optional): drop periods whose price is above this ($/MWh). Defaults to
+            100.0.
+        region (Optional[str], optional): keep only the rows of this NEM region (column
+            ``REGION``), e.g., ``"NSW1"``. Defaults to None, i.e., keep all rows.
+
+    Returns:
+        pd.DataFrame: the price series with columns ``time``, ``demand`` and ``price``.
+    """
+    if region is not None:
+        df = df[df["REGION"] == region]
+    df = df[["SETTLEMENTDATE", "TOTALDEMAND", "RRP"]].copy()
+    df["SETTLEMENTDATE"] = pd.to_datetime(df["SETTLEMENTDATE"])  # type: ignore
+    df = df.resample(resample_rule, on="SETTLEMENTDATE").mean()
+    df = df.reset_index(drop=False)
+    df = df.rename(columns={"TOTALDEMAND": "demand", "RRP": "price", "SETTLEMENTDATE": "time"})
+    # Remove outlier (> $100)
+    df = df[df["price"] <= max_price]
+    return df
+
+
+def load_csv(
+    fullpath: Union[str, os.PathLike],
+    resample_rule: str = "1h",
+    max_price: float = 100.0,
+    cache_dir: Optional[Union[str, os.PathLike]] = PRICE_CACHE_DIR,
+    region: Optional[str] = None,
+) -> pd.DataFrame:
+    """Load and preprocess a raw AEMO price-and-demand .csv file, through the on-disk cache.
+
+    Args:
+        fullpath (Union[str, os.PathLike]): the .csv file.
+        resample_rule (str, optional): resampling frequency. Defaults to "1h".
+        max_price (float, optional): drop periods whose price is above this ($/MWh). Defaults to
+            100.0.
+        cache_dir (Optional[Union[str, os.PathLike]], optional): cache directory, or ``None`` to
+            disable caching. Defaults to ``PRICE_CACHE_DIR``.
+        region (Optional[str], optional): keep only the rows of this NEM region. Defaults to None.
+
+    Returns:
+        pd.DataFrame: the price series with columns ``time``, ``demand`` and ``price``.
+    """
+    if not cache_dir:
+        return preprocess(pd.read_csv(fullpath), resample_rule, max_price, region)
+
+    df = _load_cached(fullpath, resample_rule, max_price, cache_dir, region)
+    if df is not None:
+        return df
+
+    fullpath = Path(fullpath).resolve()
+    entry, params = _cache_entry(fullpath, resample_rule, max_price, cache_dir, region)
+    df_raw = pd.read_csv(fullpath)
+    regions = df_raw["REGION"].unique().tolist() if "REGION" in df_raw.columns else []
+    df = preprocess(df_raw, resample_rule, max_price, region)
+    try:
+        _write_entry(entry, df, dict(_source_meta(fullpath, params), regions=regions))
+    except OSError as e:
+        warnings.warn(f"Cannot cache {fullpath} to {entry}: {e}")
+    return df
+
+
+def load_many(
+    sources: Union[str, os.PathLike, Sequence[Union[str, os.PathLike]]],
+    resample_rule: str = "1h",
+    max_price: float = 100.0,
+    cache_dir: Optional[Union[str, os.PathLike]] = PRICE_CACHE_DIR,
+    region: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Load and preprocess many raw AEMO price-and-demand files into one series.
+
+    Each file is preprocessed (and cached) on its own, in parallel processes, so that only the
+    hourly series, rather than all raw 5-minute files, are held in memory at the same time. The
+    per-file series are then concatenated in time order; overlapping timestamps keep the latest
+    file. Subsequent loads of the same files only memory-map their cache entries.
+
+    Args:
+        sources (Union[str, os.PathLike, Sequence[Union[str, os.PathLike]]]): the files, as a list,
+            a glob pattern (e.g., ``"data/PRICE_AND_DEMAND_*_NSW1.csv"``), or a manifest ``.txt``
+            file that lists one file per line.
+        resample_rule (str, optional): resampling frequency. Defaults to "1h".
+        max_price (float, optional): drop periods whose price is above this ($/MWh). Defaults to
+            100.0.
+        cache_dir (Optional[Union[str, os.PathLike]], optional): cache directory, or ``None`` to
+            disable caching. Defaults to ``PRICE_CACHE_DIR``.
+        region (Optional[str], optional): keep only the rows of this NEM region, which is required
+            when the files span many regions. Defaults to None.
+        max_workers (Optional[int], optional): maximum number of parsing processes. Defaults to
+            None, i.e., the number of CPUs.
+
+    Raises:
+        ValueError: when there is no file, or when ``region`` is None but the files span more
+            than one region.
+
+    Returns:
+        pd.DataFrame: the price series with columns ``time``, ``demand`` and ``price``.
+    """
+    fnames = expand_sources(sources)
+    if len(fnames) < 1:
+        raise ValueError(f"No price files found in {sources}")
+
+    # Valid cache entries, and their metadata.
+    hits: List[Optional[Tuple[Path, Dict[str, Any]]]] = [
+        _valid_entry(fname, resample_rule, max_price, cache_dir, region) if cache_dir else None
+        for fname in fnames
+    ]
+    if region is None:
+        # Prices of different regions must not be mixed into one series. Cache entries record the
+        # regions of their source file, hence only files without a valid entry are scanned.
+        regions: Set[str] = set()
+        for fname, hit in zip(fnames, hits):
+            regions.update(_regions(fname) if hit is None else hit[1]["regions"])
+        if len(regions) > 1:
+            raise ValueError(f"Price files span regions {sorted(regions)}, please specify a region")
+
+    load = partial(
+        load_csv,
+        resample_rule=resample_rule,
+        max_price=max_price,
+        cache_dir=cache_dir,
+        region=region,
+    )
+    dfs: List[Optional[pd.DataFrame]] = [
+        None if hit is None else _read_entry(hit[0]) for hit in hits
+    ]
+    if len(fnames) == 1:
+        return dfs[0] if dfs[0] is not None else load(fnames[0])
+
+    todo = [i for i, df in enumerate(dfs) if df is None]
+    if len(todo) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for i, df in zip(todo, executor.map(load, [fnames[i] for i in todo])):
+                dfs[i] = df
+    else:
+        for i in todo:
+            dfs[i] = load(fnames[i])
+
+    df = pd.concat(dfs, axis=0, ignore_index=True)
+    df = df.drop_duplicates(subset="time", keep="last")
+    df = df.sort_values("time", kind="mergesort", ignore_index=True)
+    return df
+
+
+def _regions(fname: Path) -> List[str]:
+    """NEM regions of a raw AEMO file, i.e., the distinct values of its ``REGION`` column."""
+    if "REGION" not in pd.read_csv(fname, nrows=0).columns:
+        return []
+    return pd.read_csv(fname, usecols=["REGION"])["REGION"].unique().tolist()
+
+
+def load_s3(
+    bucket: str,
+    key: str,
+    resample_rule: str = "1h",
+    max_price: float = 100.0,
+    cache_dir: Optional[Union[str, os.PathLike]] = PRICE_CACHE_DIR,
+    region: Optional[str] = None,
+) -> pd.DataFrame:
+    """Load and preprocess a raw AEMO price-and-demand .csv file on Amazon S3.
+
+    With caching enabled, the object is downloaded to ``cache_dir/s3/`` only when its ETag is not
+    there yet, and the preprocessed series is cached like a local file.
+
+    Args:
+        bucket (str): S3 bucket.
+        key (str): S3 key of the .csv file.
+        resample_rule (str, optional): resampling frequency. Defaults to "1h".
+        max_price (float, optional): drop periods whose price is above this ($/MWh). Defaults to
+            100.0.
+        cache_dir (Optional[Union[str, os.PathLike]], optional): cache directory, or ``None`` to
+            disable caching. Defaults to ``PRICE_CACHE_DIR``.
+        region (Optional[str], optional): keep only the rows of this NEM region. Defaults to None.
+
+    Returns:
+        pd.DataFrame: the price series with columns ``time``, ``demand`` and ``price``.
+    """
+    s3_client = _s3_client(os.getpid())
+    if not cache_dir:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        df = pd.read_csv(response["Body"], low_memory=False)
+        return preprocess(df, resample_rule, max_price, region)
+
+    fname = download_s3(bucket, key, Path(cache_dir) / "s3")
+    return load_csv(fname, resample_rule, max_price, cache_dir, region)
+
+
+def download_s3(bucket: str, key: str, download_dir: Union[str, os.PathLike]) -> Path:
+    """Download an S3 object, unless the local copy of its current ETag is already there.
+
+    Args:
+        bucket (str): S3 bucket.
+        key (str): S3 key.
+        download_dir (Union[str, os.PathLike]): local directory of the downloaded objects.
+
+    Returns:
+        Path: the local copy, ``download_dir/bucket/key_dir/key_stem-etag.key_suffix``.
+    """
+    s3_client = _s3_client(os.getpid())
+    etag = s3_client.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+    key_path = Path(key)
+    fname = (
+        Path(download_dir) / bucket / key_path.parent / f"{key_path.stem}-{etag}{key_path.suffix}"
+    )
+    if fname.exists():
+        return fname
+
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fname = fname.with_name(f".{fname.name}.{os.getpid()}")
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key, IfMatch=etag)
+        with tmp_fname.open("wb") as f:
+            shutil.copyfileobj(response["Body"], f)
+        os.replace(tmp_fname, fname)
+    finally:
+        if tmp_fname.exists():
+            tmp_fname.unlink()
+    return fname
+
+
+@lru_cache(maxsize=None)
+def _s3_client(pid: int):
+    """Return the S3 client of the process ``pid``, as clients must not be shared across forks."""
+    return boto3.session.Session().client("s3")
+
+
+def expand_sources(
+    sources: Union[str, os.PathLike, Sequence[Union[str, os.PathLike]]],
+) -> List[Path]:
+    """Expand price-file sources (list of files, glob pattern, or manifest) to a list of files.
+
+    Args:
+        sources (Union[str, os.PathLike, Sequence[Union[str, os.PathLike]]]): a list of files, a
+            glob pattern, a manifest ``.txt`` file that lists one file per line (relative paths are
+            relative to the manifest, and lines starting with ``#`` are ignored), or a file.
+
+    Returns:
+        List[Path]: the files.
+    """
+    if not isinstance(sources, (str, os.PathLike)):
+        return [Path(fname) for fname in sources]
+
+    if glob.has_magic(str(sources)):
+        return [Path(fname) for fname in sorted(glob.glob(str(sources)))]
+
+    sources = Path(sources)
+    if sources.suffix == ".txt":
+        with sources.open() as f:
+            lines = (line.strip() for line in f)
+            return [sources.parent / line for line in lines if line and not line.startswith("#")]
+
+    return [sources]
+
+
+def _cache_entry(
+    fullpath: Path,
+    resample_rule: str,
+    max_price: float,
+    cache_dir: Union[str, os.PathLike],
+    region: Optional[str],
+) -> Tuple[Path, Dict[str, Any]]:
+    """Return the cache entry of a source file, and its preprocessing parameters."""
+    params = {
+        "resample_rule": resample_rule,
+        "max_price": max_price,
+        "region": region,
+        "version": CACHE_VERSION,
+    }
+    key = hashlib.sha1(json.dumps([str(fullpath), params]).encode()).hexdigest()[:16]
+    return Path(cache_dir) / f"{fullpath.stem}-{key}", params
+
+
+def _valid_entry(
+    fullpath: Union[str, os.PathLike],
+    resample_rule: str,
+    max_price: float,
+    cache_dir: Union[str, os.PathLike],
+    region: Optional[str],
+) -> Optional[Tuple[Path, Dict[str, Any]]]:
+    """Return the valid cache entry of a source file and its metadata, else ``None``."""
+    fullpath = Path(fullpath).resolve()
+    entry, params = _cache_entry(fullpath, resample_rule, max_price, cache_dir, region)
+    meta = _validate(entry, fullpath, params)
+    return None if meta is None else (entry, meta)
+
+
+def _load_cached(
+    fullpath: Union[str, os.PathLike],
+    resample_rule: str,
+    max_price: float,
+    cache_dir: Union[str, os.PathLike],
+    region: Optional[str],
+) -> Optional[pd.DataFrame]:
+    """Return the cached series of a source file, or ``None`` if there is no valid cache entry."""
+    hit = _valid_entry(fullpath, resample_rule, max_price, cache_dir, region)
+    return None if hit is None else _read_entry(hit[0])
+
+
+def _sha256(fname: Path) -> str:
+    h = hashlib.sha256()
+    with fname.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_meta(fullpath: Path, params: Dict[str, Any]) -> Dict[str, Any]:
+    stat = fullpath.stat()
+    return {
+        "source": str(fullpath),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _sha256(fullpath),
+        **params,
+    }
+
+
+def _validate(entry: Path, fullpath: Path, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the metadata of a cache entry which is still valid, else ``None``."""
+    try:
+        with (entry / "meta.json").open() as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if any(meta.get(k) != v for k, v in params.items()):
+        return None
+
+    # Fast path: the source file is untouched.
+    stat = fullpath.stat()
+    if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+        return meta
+
+    # Source file is touched, but is it modified?
+    if meta["size"] != stat.st_size or meta["sha256"] != _sha256(fullpath):
+        return None
+    meta["mtime_ns"] = stat.st_mtime_ns
+    try:
+        _atomic_write_json(entry / "meta.json", meta)
+    except OSError:
+        pass
+    return meta
+
+
+def _read_entry(entry: Path) -> pd.DataFrame:
+    arrays = {col: np.load(entry / f"{col}.npy", mmap_mode="r") for col in _COLUMNS}
+    index = np.load(entry / "index.npy", mmap_mode="r")
+    # Without copy=False, pandas copies the memmaps into memory.
+    return pd.DataFrame(arrays, index=pd.Index(index, copy=False), copy=False)
+
+
+def _write_entry(entry: Path, df: pd.DataFrame, meta: Dict[str, Any]) -> None:
+    """Write a cache entry to a temporary directory, then move it in place."""
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{entry.name}-", dir=entry.parent))
+    try:
+        for col in _COLUMNS:
+            np.save(tmp_dir / f"{col}.npy", df[col].to_numpy())
+        np.save(tmp_dir / "index.npy", df.index.to_numpy())
+        _atomic_write_json(tmp_dir / "meta.json", meta)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_dir, entry)
+    except OSError:
+        # E.g., another process has just written the same entry.
+        if not (entry / "meta.json").exists():
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _atomic_write_json(fname: Path, obj: Any) -> None:
+    tmp_fname = fname.with_name(f".{fname.name}.{os.getpid()}")
+    with tmp_fname.open("w") as f:
+        json.dump(obj, f)
+    os.replace(tmp_fname, fname)
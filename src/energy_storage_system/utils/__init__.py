@@ -1,3 +1,20 @@
 from ._data import download_aeom_data
-from ._report import Report, ReportIO, plot_analysis, plot_reward
-from ._rl import TrainResult, evaluate_episode, train
+from ._downsample import bucket_counts, downsample_minmax
+from ._report import (
+    ANALYSIS_COLUMNS,
+    HistoryWriter,
+    Report,
+    ReportIO,
+    plot_analysis,
+    plot_reward,
+)
+from ._rl import (
+    History,
+    TrainResult,
+    compare_agents,
+    evaluate_episode,
+    fast_train,
+    parallel_train,
+    train,
+)
+from ._summary import SUMMARY_COLUMNS, summarize_episodes
@@ -0,0 +1,62 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def downsample_minmax(df: pd.DataFrame, max_points: Optional[int] = 2000) -> pd.DataFrame:
+    """Keep at most ``max_points`` rows of a dataframe, without losing its peaks and troughs.
+
+    The rows are split into equal-size buckets, and only the rows where a column reaches its
+    minimum or maximum within a bucket are kept (plus the first and last rows), in their original
+    order and with their original index. Line charts of the result look the same as the full data,
+    yet are built from a bounded number of points.
+
+    Args:
+        df (pd.DataFrame): numeric columns to plot, e.g., ``df_history[["energy"]]``.
+        max_points (Optional[int], optional): maximum number of rows. Defaults to 2000. None to
+            keep all rows.
+
+    Returns:
+        pd.DataFrame: the rows to plot, which is ``df`` itself when it has few enough rows.
+    """
+    n = len(df)
+    if max_points is None or n <= max_points:
+        return df
+
+    buckets = max(1, (max_points - 2) // (2 * max(1, df.shape[1])))
+    bucket = np.arange(n) * buckets // n
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    for col in df.columns:
+        grouped = pd.Series(df[col].to_numpy()).groupby(bucket)
+        keep[grouped.idxmin().to_numpy()] = True
+        keep[grouped.idxmax().to_numpy()] = True
+
+    return df.iloc[np.flatnonzero(keep)]
+
+
+def bucket_counts(ser: pd.Series, max_points: Optional[int] = 2000) -> pd.DataFrame:
+    """Count the occurrences of each value of a series, in equal-size buckets of consecutive rows.
+
+    This summarizes a long series of discrete values (e.g., actions) with at most ``max_points``
+    counts, instead of one scatter point per row.
+
+    Args:
+        ser (pd.Series): discrete values.
+        max_points (Optional[int], optional): maximum number of counts, across all values. Defaults
+            to 2000. None for one bucket per row.
+
+    Returns:
+        pd.DataFrame: one row per bucket, indexed by the index of its first row, and one column
+        per distinct value.
+    """
+    n = len(ser)
+    values = ser.to_numpy()
+    buckets = n if max_points is None else max(1, min(n, max_points // max(1, ser.nunique())))
+    bucket = np.arange(n) * buckets // n
+
+    counts = pd.crosstab(bucket, values)
+    counts.index = ser.index[np.searchsorted(bucket, counts.index)]
+    counts.columns.name = ser.name
+    return counts
@@ -1,11 +1,15 @@
 import json
 import os
 import warnings
+from concurrent.futures import Future, ProcessPoolExecutor
 from functools import partial
-from typing import List, Sequence, Union
+from typing import Iterator, List, Optional, Sequence, Union
 
 import matplotlib
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 import seaborn as sns
 from matplotlib import pyplot as plt
 
@@ -17,6 +21,24 @@ except ImportError:
     )
     from pathlib import Path
 
+from ..envs import SimpleBattery
+from ._downsample import bucket_counts, downsample_minmax
+from ._rl import History
+from ._summary import SUMMARY_COLUMNS, summarize_episodes
+
+# Columns of the training history which plot_analysis() needs.
+ANALYSIS_COLUMNS = [
+    "average_energy_cost",
+    "market_electric_price",
+    "action",
+    "reward",
+    "total_reward",
+    "energy",
+]
+
+# Process pool of ReportIO.save2(..., render="background"), created on first use.
+_render_pool: Optional[ProcessPoolExecutor] = None
+
 
 class Report:
     """A container to hold episodes's rewards and training history."""
@@ -33,27 +55,143 @@ class Report:
 
 
 class ReportIO:
-    """A class to load an existing report, and to save a new report."""
+    """A class to load an existing report, and to save a new report.
+
+    A report directory holds the rewards (``rewards_list.*``) and the training history
+    (``df_history.*``) in one of :attr:`FORMATS`, or the history as chunk files under
+    ``df_history/`` (see :meth:`history_writer`). The format of an existing report is detected
+    automatically, so legacy CSV + JSON reports remain readable.
+    """
 
-    def __init__(self, prefix: Union[str, os.PathLike]) -> None:
+    # Format name => file extension. The csv format stores the rewards as .json.
+    FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+    # Figure name => file name.
+    FIGURES = {"reward": "reward.png", "analysis": "analysis.png"}
+    RENDER_MODES = ("eager", "lazy", "background")
+
+    def __init__(self, prefix: Union[str, os.PathLike], format: str = "parquet") -> None:
         """Initialize a `ReportIO` instance.
 
         Args:
             prefix (Union[str, os.PathLike]): directory of an existing report, or for new report.
+            format (str, optional): format of new reports, one of "parquet", "arrow" (Arrow IPC,
+                a.k.a. Feather v2), or "csv". Defaults to "parquet".
         """
+        if format not in self.FORMATS:
+            raise ValueError(f"Format must be one of {list(self.FORMATS)}, but getting {format}")
         self.prefix = Path(prefix)
+        self.format = format
 
-    def load(self) -> Report:
+    def load(self, columns: Optional[List[str]] = None) -> Report:
         """Load an existing report.
 
+        The training history is the first of ``df_history.parquet``, ``df_history.arrow``, and
+        ``df_history.csv`` that exists, otherwise the chunks written by a :meth:`history_writer`.
+        Without a ``rewards_list.*`` file, the rewards default to the final total reward of each
+        episode.
+
+        Args:
+            columns (Optional[List[str]], optional): columns of the training history to read, e.g.,
+                only the ones to plot. Defaults to None, i.e., all columns.
+
         Returns:
             Report: the loaded report.
         """
-        with (self.prefix / "rewards_list.json").open() as f:
-            rewards_list = json.load(f)
-        df_history = pd.read_csv(self.prefix / "df_history.csv", low_memory=False)
+        df_history = self.load_history(columns)
+        rewards_list = self._read_rewards()
+        if rewards_list is None:
+            df = df_history
+            if columns is not None and not {"episode", "total_reward"} <= set(columns):
+                df = self.load_history(["episode", "total_reward"])
+            rewards_list = df.groupby("episode", sort=False)["total_reward"].last().tolist()
         return Report(rewards_list, df_history)
 
+    def load_history(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load only the training history of an existing report, without its rewards.
+
+        Args:
+            columns (Optional[List[str]], optional): columns to read. Defaults to None, i.e., all.
+
+        Raises:
+            FileNotFoundError: when there is no training history under the report directory.
+
+        Returns:
+            pd.DataFrame: the training history.
+        """
+        for format, ext in self.FORMATS.items():
+            fname = self.prefix / f"df_history{ext}"
+            if fname.exists():
+                return _read_frame(fname, format, columns)
+        if (self.prefix / HistoryWriter.DIRNAME).exists():
+            return pd.concat(list(self.iter_history(columns)), ignore_index=True)
+        raise FileNotFoundError(f"No training history under {self.prefix}")
+
+    def _read_rewards(self) -> Optional[List[float]]:
+        for format, ext in self.FORMATS.items():
+            fname = self.prefix / f"rewards_list{ext if format != 'csv' else '.json'}"
+            if not fname.exists():
+                continue
+            if format == "csv":
+                with fname.open() as f:
+                    return json.load(f)
+            return _read_frame(fname, format)["reward"].tolist()
+        return None
+
+    def summarize(self, env: SimpleBattery) -> pd.DataFrame:
+        """Summarize each episode of the training history, and save it as ``summary.*``.
+
+        Only the columns needed by :func:`summarize_episodes` are read from the history.
+
+        Args:
+            env (SimpleBattery): battery environment, which provides the battery configuration.
+
+        Returns:
+            pd.DataFrame: the per-episode summary.
+        """
+        df_summary = summarize_episodes(self.load_history(SUMMARY_COLUMNS), env)
+        _write_frame(df_summary, self.prefix / f"summary{self.FORMATS[self.format]}", self.format)
+        return df_summary
+
+    def load_summary(self) -> pd.DataFrame:
+        """Load the per-episode summary saved by :meth:`summarize`.
+
+        Raises:
+            FileNotFoundError: when the report has no summary.
+
+        Returns:
+            pd.DataFrame: the per-episode summary.
+        """
+        for format, ext in self.FORMATS.items():
+            fname = self.prefix / f"summary{ext}"
+            if fname.exists():
+                return _read_frame(fname, format)
+        raise FileNotFoundError(f"No summary under {self.prefix}")
+
+    def history_writer(self, format: Optional[str] = None) -> "HistoryWriter":
+        """Create a sink which streams the training history into this report.
+
+        Args:
+            format (Optional[str], optional): format of the chunk files, "parquet" or "arrow".
+                Defaults to None, i.e., the format of this `ReportIO`.
+
+        Returns:
+            HistoryWriter: the sink, e.g., for ``train(..., sink=...)``.
+        """
+        return HistoryWriter(self.prefix, format or self.format)
+
+    def iter_history(self, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Lazily read the training history written by a :meth:`history_writer`, chunk by chunk.
+
+        Args:
+            columns (Optional[List[str]], optional): columns to read. Defaults to None, i.e., all.
+
+        Yields:
+            Iterator[pd.DataFrame]: the history chunks, in order.
+        """
+        formats = {ext: format for format, ext in self.FORMATS.items()}
+        for fname in sorted((self.prefix / HistoryWriter.DIRNAME).glob("part-*")):
+            yield _read_frame(fname, formats[fname.suffix], columns)
+
     def save(self, report: Report, close_fig: bool = False) -> None:
         """Save an in-memory report to disk.
 
@@ -69,35 +207,178 @@ class ReportIO:
         rewards_list: Sequence[float],
         df_history: pd.DataFrame,
         close_fig: bool = False,
-    ) -> None:
+        render: str = "eager",
+    ) -> Optional[Future]:
         """Save the mean rewards-per-episode and training history to disk.
 
+        Files of the other formats are removed, so that :meth:`load` reads back this report.
+
         Args:
             rewards_list (Sequence[float]): Save mean rewards-per-episode and training history to
                 disk.
             df_history (pd.DataFrame): training history.
             close_fig (bool, optional): set to ``True`` to prevent Jupyter to auto-display the
                 generated figures. Defaults to False.
+            render (str, optional): when to render the figures. "eager" renders them now, "lazy"
+                only saves the data and defers the figures to :meth:`render` or
+                :meth:`figure_path`, and "background" renders them from the saved data in a
+                background process. Defaults to "eager".
+
+        Returns:
+            Optional[Future]: the background rendering, when ``render`` is "background".
         """
+        if render not in self.RENDER_MODES:
+            raise ValueError(f"Render must be one of {self.RENDER_MODES}, but getting {render}")
+
         p = self.prefix
         p.mkdir(exist_ok=True)
+        stale = [
+            f"{stem}{ext}"
+            for stem in ("rewards_list", "df_history", "summary")
+            for ext in self.FORMATS.values()
+        ]
+        for fname in stale + ["rewards_list.json"] + list(self.FIGURES.values()):
+            if (p / fname).exists():
+                (p / fname).unlink()
+
+        ext = self.FORMATS[self.format]
+        if self.format == "csv":
+            with (p / "rewards_list.json").open("w") as f:
+                json.dump(rewards_list, f)
+        else:
+            _write_frame(
+                pd.DataFrame({"reward": rewards_list}), p / f"rewards_list{ext}", self.format
+            )
+        _write_frame(df_history, p / f"df_history{ext}", self.format)
+
+        if render == "eager":
+            self._save_figures(rewards_list, df_history, close_fig)
+        elif render == "background":
+            global _render_pool
+            if _render_pool is None:
+                _render_pool = ProcessPoolExecutor()
+            return _render_pool.submit(_render_report, self.prefix)
+        return None
+
+    def render(self, force: bool = False, close_fig: bool = True) -> None:
+        """Render the figures of the report from its saved data, unless they already exist.
 
-        with (p / "rewards_list.json").open("w") as f:
-            json.dump(rewards_list, f)
+        Args:
+            force (bool, optional): re-render existing figures too. Defaults to False.
+            close_fig (bool, optional): set to ``True`` to prevent Jupyter to auto-display the
+                generated figures. Defaults to True.
+        """
+        for name in self.FIGURES:
+            if force or not (self.prefix / self.FIGURES[name]).exists():
+                self._render_figure(name, close_fig)
 
+    def figure_path(self, name: str) -> Path:
+        """Path of a figure of the report, which is rendered on the first request.
+
+        Args:
+            name (str): the figure, "reward" or "analysis".
+
+        Returns:
+            Path: the .png file.
+        """
+        fname = self.prefix / self.FIGURES[name]
+        if not fname.exists():
+            self._render_figure(name, close_fig=True)
+        return fname
+
+    def _render_figure(self, name: str, close_fig: bool) -> None:
+        if name == "reward":
+            fig = plot_reward(self._read_rewards() or self.load(["episode"]).rewards_list)
+        else:
+            fig = plot_analysis(self.load_history(ANALYSIS_COLUMNS))
+        fig.savefig(self.prefix / self.FIGURES[name])
+        if close_fig:
+            plt.close(fig)
+
+    def _save_figures(
+        self, rewards_list: Sequence[float], df_history: pd.DataFrame, close_fig: bool
+    ) -> None:
+        p = self.prefix
         fig = plot_reward(rewards_list)
-        fig.savefig(p / "reward.png")
+        fig.savefig(p / self.FIGURES["reward"])
         if close_fig:
             plt.close()
 
-        df_history.to_csv(p / "df_history.csv", index=False)
         fig = plot_analysis(df_history)
-        fig.savefig(p / "analysis.png")
+        fig.savefig(p / self.FIGURES["analysis"])
 
         if close_fig:
             plt.close()
 
 
+def _render_report(prefix: Path) -> None:
+    """Render the figures of a report, in a background process."""
+    matplotlib.use("Agg")
+    ReportIO(prefix).render()
+
+
+def _read_frame(fname: Path, format: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a dataframe, or only some of its columns, from a file."""
+    if format == "csv":
+        df = pd.read_csv(fname, usecols=columns, low_memory=False)
+        return df if columns is None else df[columns]
+
+    with fname.open("rb") as f:
+        if format == "parquet":
+            return pq.read_table(f, columns=columns).to_pandas()
+        return feather.read_table(f, columns=columns).to_pandas()
+
+
+def _write_frame(df: pd.DataFrame, fname: Path, format: str) -> None:
+    """Write a dataframe to a file, with typed columns unless ``format`` is "csv"."""
+    if format == "csv":
+        df.to_csv(fname, index=False)
+        return
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with fname.open("wb") as f:
+        if format == "parquet":
+            pq.write_table(table, f)
+        else:
+            feather.write_feather(table, f)
+
+
+class HistoryWriter:
+    """Write training-history chunks into the ``df_history/`` directory of a report.
+
+    Each call writes one ``part-NNNNN.parquet`` (or ``.arrow``) file. Existing chunks in the
+    directory are deleted at creation.
+    """
+
+    DIRNAME = "df_history"
+    FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+    def __init__(self, prefix: Union[str, os.PathLike], format: str = "parquet") -> None:
+        """Initialize a `HistoryWriter` instance.
+
+        Args:
+            prefix (Union[str, os.PathLike]): directory of the report.
+            format (str, optional): "parquet" or "arrow". Defaults to "parquet".
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Format must be one of {list(self.FORMATS)}, but getting {format}")
+        self.format = format
+        self.dirname = Path(prefix) / self.DIRNAME
+        self.dirname.mkdir(parents=True, exist_ok=True)
+        for fname in self.dirname.glob("part-*"):
+            fname.unlink()
+        self.chunks = 0
+
+    def __call__(self, history: History) -> None:
+        fname = self.dirname / f"part-{self.chunks:05d}{self.FORMATS[self.format]}"
+        with fname.open("wb") as f:
+            if self.format == "parquet":
+                pq.write_table(history.to_arrow(), f)
+            else:
+                feather.write_feather(history.to_arrow(), f)
+        self.chunks += 1
+
+
 def plot_reward(rewards_list: Sequence[float]) -> matplotlib.figure.Figure:
     """Plot the mean reward of each episode.
 
@@ -116,15 +397,24 @@ def plot_reward(rewards_list: Sequence[float]) -> matplotlib.figure.Figure:
     return fig
 
 
-def plot_analysis(df_history: pd.DataFrame, episode: List = None) -> matplotlib.figure.Figure:
+def plot_analysis(
+    df_history: pd.DataFrame, episode: List = None, max_points: Optional[int] = 2000
+) -> matplotlib.figure.Figure:
     """Plot the evaluation charts of an episode.
 
+    Long histories are downsampled to at most ``max_points`` points per chart: line charts keep
+    the minimum and maximum of equal-size buckets of steps, and actions are counted per bucket
+    instead of being scattered one point per step. Select a few episodes to zoom into them at
+    full resolution.
+
     Args:
-        df_history (pd.DataFrame): [description]
-        episode (List, optional): [description]. Defaults to None.
+        df_history (pd.DataFrame): training or evaluation history.
+        episode (List, optional): plot only these episodes. Defaults to None, i.e., all.
+        max_points (Optional[int], optional): maximum number of points per chart. Defaults to
+            2000. None to plot every step.
 
     Returns:
-        matplotlib.figure.Figure: [description]
+        matplotlib.figure.Figure: the plot.
     """
     if episode is not None:
         df_temp = df_history[df_history["episode"].isin(episode)]
@@ -136,12 +426,22 @@ def plot_analysis(df_history: pd.DataFrame, episode: List = None) -> matplotlib.
 
     print(f"Average reward: {df_temp['reward'].sum():.02f}")
 
+    downsample = partial(downsample_minmax, max_points=max_points)
+    if max_points is None or len(df_temp) <= max_points:
+        plot_action = partial(sns.scatterplot, data=df_temp[["action"]])
+    else:
+        counts = bucket_counts(df_temp["action"], max_points).rename(
+            columns=SimpleBattery.ACTION_NAMES
+        )
+        plot_action = partial(sns.lineplot, data=counts)
     funcs = (
-        partial(sns.lineplot, data=df_temp[["average_energy_cost", "market_electric_price"]]),
-        partial(sns.scatterplot, data=df_temp[["action"]]),
-        partial(sns.lineplot, data=df_temp[["reward"]]),
-        partial(sns.lineplot, data=df_temp[["total_reward"]]),
-        partial(sns.lineplot, data=df_temp[["energy"]]),
+        partial(
+            sns.lineplot, data=downsample(df_temp[["average_energy_cost", "market_electric_price"]])
+        ),
+        plot_action,
+        partial(sns.lineplot, data=downsample(df_temp[["reward"]])),
+        partial(sns.lineplot, data=downsample(df_temp[["total_reward"]])),
+        partial(sns.lineplot, data=downsample(df_temp[["energy"]])),
     )
     for ax, f in zip(axs, funcs):
         f(ax=ax)
@@ -1,16 +1,205 @@
-from typing import List
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from tqdm import tqdm
 
 from ..agents import Agent
-from ..envs import SimpleBattery
+from ..envs import SimpleBattery, VectorSimpleBattery
+
+
+def _observation_columns(num_obs: int) -> List[str]:
+    """Column names of the observations of :class:`SimpleBattery`."""
+    return ["energy", "average_energy_cost", "market_electric_price"] + [
+        f"price_t{i}" for i in range(1, num_obs - 2)
+    ]
+
+
+class History:
+    """Per-step training history, recorded into preallocated, typed NumPy columns.
+
+    Each step is one row of ``episode``, ``reward``, ``total_reward``, ``action``, and the
+    observation whose fields are stored column-major, so that every column is a contiguous array.
+    The buffers grow by doubling when a row does not fit.
+    """
+
+    def __init__(self, num_obs: int, capacity: int = 1024) -> None:
+        """Create an empty history.
+
+        Args:
+            num_obs (int): length of the observations, i.e., ``3 + HIST_PRICE_HORIZON``.
+            capacity (int, optional): number of preallocated rows. Defaults to 1024.
+        """
+        self.num_obs = num_obs
+        self._size = 0
+        self._episode = np.empty(capacity, dtype=np.int32)
+        self._reward = np.empty(capacity, dtype=np.float64)
+        self._total_reward = np.empty(capacity, dtype=np.float64)
+        self._action = np.empty(capacity, dtype=np.int8)
+        self._obs = np.empty((num_obs, capacity), dtype=np.float64)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        episode: np.ndarray,
+        total_reward: np.ndarray,
+        action: np.ndarray,
+        obs: np.ndarray,
+        reward: np.ndarray,
+    ) -> "History":
+        """Create a history from its columns.
+
+        Args:
+            episode (np.ndarray): episode of each step.
+            total_reward (np.ndarray): cumulative reward of the episode at each step.
+            action (np.ndarray): action of each step.
+            obs (np.ndarray): observation of each step, of shape ``(steps, num_obs)``.
+            reward (np.ndarray): reward of each step.
+
+        Returns:
+            History: the history.
+        """
+        history = cls(obs.shape[1], capacity=0)
+        history._size = len(episode)
+        history._episode = np.asarray(episode, dtype=np.int32)
+        history._reward = np.asarray(reward, dtype=np.float64)
+        history._total_reward = np.asarray(total_reward, dtype=np.float64)
+        history._action = np.asarray(action, dtype=np.int8)
+        history._obs = np.ascontiguousarray(obs.T, dtype=np.float64)
+        return history
+
+    @classmethod
+    def concat(cls, histories: Sequence["History"]) -> "History":
+        """Concatenate histories, in order."""
+        return cls.from_arrays(
+            np.concatenate([h.episode for h in histories]),
+            np.concatenate([h.total_reward for h in histories]),
+            np.concatenate([h.action for h in histories]),
+            np.concatenate([h.obs for h in histories], axis=0),
+            np.concatenate([h.reward for h in histories]),
+        )
+
+    def __len__(self) -> int:
+        """Return the number of recorded steps."""
+        return self._size
+
+    def append(
+        self,
+        episode: int,
+        total_reward: float,
+        action: int,
+        state: Sequence[float],
+        reward: float = 0.0,
+    ):
+        """Record a step."""
+        if self._size == len(self._episode):
+            self._grow(max(1024, 2 * self._size))
+        i = self._size
+        self._episode[i] = episode
+        self._reward[i] = reward
+        self._total_reward[i] = total_reward
+        self._action[i] = action
+        self._obs[:, i] = state
+        self._size += 1
+
+    def settle(self, reward: float, total_reward: float) -> None:
+        """Set the rewards of the last recorded step.
+
+        The observation of a step must be recorded before ``env.step()``, which may overwrite it
+        (``OBS_BUFFER``), but the reward is only known after.
+        """
+        self._reward[self._size - 1] = reward
+        self._total_reward[self._size - 1] = total_reward
+
+    def _grow(self, capacity: int) -> None:
+        self._episode = np.resize(self._episode[: self._size], capacity)
+        self._reward = np.resize(self._reward[: self._size], capacity)
+        self._total_reward = np.resize(self._total_reward[: self._size], capacity)
+        self._action = np.resize(self._action[: self._size], capacity)
+        obs = np.empty((self.num_obs, capacity), dtype=np.float64)
+        obs[:, : self._size] = self._obs[:, : self._size]
+        self._obs = obs
+
+    @property
+    def episode(self) -> np.ndarray:
+        """Episode of each step."""
+        return self._episode[: self._size]
+
+    @property
+    def reward(self) -> np.ndarray:
+        """Reward of each step."""
+        return self._reward[: self._size]
+
+    @property
+    def total_reward(self) -> np.ndarray:
+        """Cumulative reward of the episode at each step."""
+        return self._total_reward[: self._size]
+
+    @property
+    def action(self) -> np.ndarray:
+        """Action of each step."""
+        return self._action[: self._size]
+
+    @property
+    def obs(self) -> np.ndarray:
+        """Observations, of shape ``(steps, num_obs)``, as a view of the column-major buffer."""
+        return self._obs[:, : self._size].T
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Columns as contiguous arrays, which are views of the buffers."""
+        columns = {
+            "episode": self.episode,
+            "reward": self.reward,
+            "total_reward": self.total_reward,
+            "action": self.action,
+        }
+        for name, values in zip(_observation_columns(self.num_obs), self._obs):
+            columns[name] = values[: self._size]
+        return columns
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the history as a dataframe, which avoids copying the columns where pandas can."""
+        return pd.DataFrame(self.columns, copy=False)
+
+    def to_arrow(self):
+        """Return the history as a zero-copy ``pyarrow.Table``."""
+        columns = self.columns
+        return pa.table(list(columns.values()), names=list(columns))
+
+    def to_list(self) -> List[List]:
+        """Return the history as ``[episode, total_reward, action] + state`` lists, one per step."""
+        return [
+            [episode, total_reward, action] + state
+            for episode, total_reward, action, state in zip(
+                self.episode.tolist(),
+                self.total_reward.tolist(),
+                self.action.tolist(),
+                self.obs.tolist(),
+            )
+        ]
 
 
 class TrainResult:
-    def __init__(self, rewards_list: List[float], history_list: List[float]) -> None:
+    def __init__(
+        self, rewards_list: List[float], history: Optional[Union[History, List]] = None
+    ) -> None:
         self.rewards_list = rewards_list
-        self.history_list = history_list
+        self.history = history
+
+    @property
+    def history_list(self) -> Optional[List]:
+        """History as one ``[episode, total_reward, action] + state`` list per step.
+
+        This materializes one Python list per step; prefer ``history.to_frame()``. None when the
+        history was streamed to a sink.
+        """
+        if isinstance(self.history, History):
+            return self.history.to_list()
+        return self.history
 
     @property
     def mean_rewards(self) -> float:
@@ -18,29 +207,242 @@ class TrainResult:
         return sum(self.rewards_list) / len(self.rewards_list)
 
 
-def train(env: SimpleBattery, agent: Agent, episodes: int = 3000):
+def train(
+    env: SimpleBattery,
+    agent: Agent,
+    episodes: int = 3000,
+    sink: Optional[Callable[[History], None]] = None,
+    flush_every: int = 100,
+) -> TrainResult:
+    """Run an agent over many episodes, and record the history of every step.
+
+    By default, the whole history is held in memory until the end. With a ``sink``, the history is
+    instead handed over every ``flush_every`` episodes, then dropped, so the memory use does not
+    grow with the number of episodes. The sink can be a :class:`HistoryWriter` (see
+    :meth:`ReportIO.history_writer`), or any callable that consumes :class:`History` chunks.
+
+    Args:
+        env (SimpleBattery): battery environment.
+        agent (Agent): the agent.
+        episodes (int, optional): number of episodes. Defaults to 3000.
+        sink (Optional[Callable[[History], None]], optional): consumer of the history chunks.
+            Defaults to None, i.e., keep the history in the returned result.
+        flush_every (int, optional): number of episodes per history chunk, when ``sink`` is given.
+            Defaults to 100.
+
+    Returns:
+        TrainResult: rewards of all episodes, and their history unless it went to ``sink``.
+    """
     if episodes < 1:
         raise ValueError(f"Number of episodes must be >1, but getting {episodes}.")
+    if flush_every < 1:
+        raise ValueError(f"flush_every must be > 0, but getting {flush_every}.")
 
+    num_obs = env.observation_space.shape[0]
+    chunk_episodes = episodes if sink is None else min(episodes, flush_every)
     rewards_list: List[float] = []
-    history_list: List[float] = []
+    history = History(num_obs, chunk_episodes * env.MAX_STEPS_PER_EPISODE)
 
     for i in tqdm(range(episodes)):
         done = False
         state = env.reset()
+        if isinstance(agent, Agent):
+            agent.reset()
         total_rewards = 0
 
         while not done:
             action = agent.compute_action(state)
+            # Record the observation before env.step(), which may overwrite it (OBS_BUFFER).
+            history.append(i, total_rewards, action, state)
             next_state, reward, done, info = env.step(action)
             total_rewards += reward
-            history_list.append([i] + [total_rewards] + [action] + state)
+            history.settle(reward, total_rewards)
             state = next_state
 
         # print(f"Episode {i+1} ({env.counter}):{total_rewards}")
         rewards_list.append(total_rewards)
 
-    return TrainResult(rewards_list, history_list)
+        if sink is not None and ((i + 1) % flush_every == 0 or i + 1 == episodes):
+            sink(history)
+            history = History(num_obs, chunk_episodes * env.MAX_STEPS_PER_EPISODE)
+
+    if sink is not None:
+        return TrainResult(rewards_list)
+    return TrainResult(rewards_list, history)
+
+
+def fast_train(env: SimpleBattery, agent: Agent, episodes: int = 3000) -> TrainResult:
+    """Vectorized equivalent of :func:`train`.
+
+    All episodes are simulated in lockstep by a :class:`VectorSimpleBattery` that shares the price
+    series and the start indexes of ``env``, and the actions of all episodes are computed by one
+    call to :meth:`Agent.compute_actions` per step. For agents whose actions do not consume random
+    numbers (e.g., :class:`PriceVsCostAgent`), the result is identical to
+    ``train(env, agent, episodes)`` under the same ``np.random`` seed.
+
+    Args:
+        env (SimpleBattery): battery environment, which provides the configuration and prices.
+        agent (Agent): the agent. A stateful agent must keep one state per row of the batch.
+        episodes (int, optional): number of episodes. Defaults to 3000.
+
+    Returns:
+        TrainResult: rewards and history of all episodes.
+    """
+    if episodes < 1:
+        raise ValueError(f"Number of episodes must be >1, but getting {episodes}.")
+
+    vector_env = VectorSimpleBattery(env, num_envs=episodes, auto_reset=False)
+    steps = env.MAX_STEPS_PER_EPISODE
+    states = vector_env.reset()
+    if isinstance(agent, Agent):
+        agent.reset()
+    history_states = np.empty((steps,) + states.shape, dtype=np.float64)
+    history_actions = np.empty((steps, episodes), dtype=np.int64)
+    history_rewards = np.empty((steps, episodes), dtype=np.float64)
+
+    for t in range(steps):
+        actions = agent.compute_actions(states)
+        history_states[t] = states
+        history_actions[t] = actions
+        states, history_rewards[t], _, _ = vector_env.step(actions)
+
+    # Episode-major order, same as train().
+    total_rewards = np.cumsum(history_rewards, axis=0).T
+    history = History.from_arrays(
+        np.repeat(np.arange(episodes), steps),
+        total_rewards.ravel(),
+        history_actions.T.ravel(),
+        history_states.transpose(1, 0, 2).reshape(episodes * steps, -1),
+        history_rewards.T.ravel(),
+    )
+
+    return TrainResult(total_rewards[:, -1].tolist(), history)
+
+
+def parallel_train(
+    env_config: Dict,
+    agent: Agent,
+    episodes: int = 3000,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> TrainResult:
+    """Equivalent of :func:`train` which runs the episodes in parallel processes.
+
+    The start index of every episode is drawn upfront by one environment, seeded by ``seed``. Then,
+    the episodes are split into contiguous chunks, each of which runs in a worker process with its
+    own environment built from ``env_config`` (but reusing the already-loaded prices). Before each
+    episode, the global ``np.random`` (e.g., of :class:`RandomAgent`) is seeded from ``seed`` and
+    the episode number. Hence, for a given ``seed``, the result does not depend on ``max_workers``.
+
+    Args:
+        env_config (Dict): environment configuration.
+        agent (Agent): the agent, which is copied to each worker process.
+        episodes (int, optional): number of episodes. Defaults to 3000.
+        seed (Optional[int], optional): the seed. Defaults to None, i.e., drawn from the global
+            ``np.random``.
+        max_workers (Optional[int], optional): maximum number of processes, or 1 to run in this
+            process. Defaults to None, i.e., the number of CPUs.
+
+    Returns:
+        TrainResult: rewards and history of all episodes, in episode order.
+    """
+    if episodes < 1:
+        raise ValueError(f"Number of episodes must be >1, but getting {episodes}.")
+    if seed is None:
+        seed = int(np.random.randint(2**31))
+
+    env = SimpleBattery(dict(env_config))
+    env.seed(seed)
+    start_indexes: List[int] = []
+    for _ in range(episodes):
+        env.reset()
+        start_indexes.append(env.index)
+    episode_seeds = np.random.SeedSequence(seed).generate_state(episodes).tolist()
+
+    # A few chunks per worker, to balance the load.
+    workers = max_workers or os.cpu_count() or 1
+    bounds = np.linspace(0, episodes, min(episodes, 4 * workers) + 1).astype(int)
+    chunks = [range(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    args = [
+        (
+            env.env_config,
+            env.df_price,
+            agent,
+            chunk,
+            start_indexes[chunk.start : chunk.stop],
+            episode_seeds[chunk.start : chunk.stop],
+        )
+        for chunk in chunks
+    ]
+
+    results = _run_chunks(_train_episodes, args, [len(chunk) for chunk in chunks], workers)
+    rewards_list: List[float] = []
+    for rewards, _ in results:
+        rewards_list.extend(rewards)
+    return TrainResult(rewards_list, History.concat([history for _, history in results]))
+
+
+def _run_chunks(func: Callable, args: List, sizes: List[int], workers: int) -> List:
+    """Call ``func(*arg)`` for each of ``args``, in worker processes unless ``workers`` is 1.
+
+    Args:
+        func (Callable): function to call, which must be picklable.
+        args (List): arguments of each call.
+        sizes (List[int]): number of episodes of each call, for the progress bar.
+        workers (int): maximum number of processes.
+
+    Returns:
+        List: result of each call, in the order of ``args``.
+    """
+    results: List = [None] * len(args)
+    with tqdm(total=sum(sizes)) as pbar:
+        if workers == 1:
+            for i, arg in enumerate(args):
+                results[i] = func(*arg)
+                pbar.update(sizes[i])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(func, *arg): i for i, arg in enumerate(args)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()
+                    pbar.update(sizes[i])
+    return results
+
+
+def _train_episodes(
+    env_config: Dict,
+    df_price: pd.DataFrame,
+    agent: Agent,
+    episodes: Sequence[int],
+    start_indexes: Sequence[int],
+    seeds: Sequence[int],
+):
+    """Run some episodes of :func:`parallel_train`, in a worker process."""
+    env = SimpleBattery(dict(env_config), df_price=df_price)
+    rewards_list: List[float] = []
+    history = History(env.observation_space.shape[0], len(episodes) * env.MAX_STEPS_PER_EPISODE)
+
+    for i, start_index, seed in zip(episodes, start_indexes, seeds):
+        np.random.seed(seed)
+        done = False
+        state = env.reset(start_index)
+        if isinstance(agent, Agent):
+            agent.reset()
+        total_rewards = 0
+
+        while not done:
+            action = agent.compute_action(state)
+            # Record the observation before env.step(), which may overwrite it (OBS_BUFFER).
+            history.append(i, total_rewards, action, state)
+            next_state, reward, done, info = env.step(action)
+            total_rewards += reward
+            history.settle(reward, total_rewards)
+            state = next_state
+
+        rewards_list.append(total_rewards)
+
+    return rewards_list, history
 
 
 def evaluate_episode(agent: Agent, env: SimpleBattery) -> pd.DataFrame:
@@ -51,7 +453,7 @@ def evaluate_episode(agent: Agent, env: SimpleBattery) -> pd.DataFrame:
         env (SimpleBattery): battery environment.
 
     Returns:
-        pd.DataFrametype: result dataframe which has these columns::
+        pd.DataFrame: result dataframe, with one row per step and these columns::
 
             [
                 "reward",
@@ -61,39 +463,153 @@ def evaluate_episode(agent: Agent, env: SimpleBattery) -> pd.DataFrame:
                 "average_energy_cost",
                 "market_electric_price",
                 "price_t1",
-                "price_t2",
-                "price_t3",
-                "price_t4",
-                "price_t5",   # FIXME: what happen when moving-avg-agent uses window_size != 5?
+                ...,
+                "price_t{HIST_PRICE_HORIZON}",
             ]
+
+        The observation columns, from ``energy`` onwards, are stored as a single 2-D block.
     """
+    num_obs = env.observation_space.shape[0]
+    rewards = np.empty(env.MAX_STEPS_PER_EPISODE, dtype=np.float64)
+    actions = np.empty(env.MAX_STEPS_PER_EPISODE, dtype=np.int64)
+    obs = np.empty((env.MAX_STEPS_PER_EPISODE, num_obs), dtype=np.float64)
 
-    evaluation_list: List = []
     done = False
     state = env.reset()
+    if isinstance(agent, Agent):
+        agent.reset()
     print(f"Index: {env.index}")
-    total_rewards = 0
+    steps = 0
 
     while not done:
         action = agent.compute_action(state)
+        obs[steps] = state
         next_state, reward, done, info = env.step(action)
-        total_rewards += reward
-        evaluation_list.append([reward] + [total_rewards] + [action] + state)
+        rewards[steps] = reward
+        actions[steps] = action
         state = next_state
+        steps += 1
 
-    df_cols = [
-        "reward",
-        "total_reward",
-        "action",
-        "energy",
-        "average_energy_cost",
-        "market_electric_price",
-        "price_t1",
-        "price_t2",
-        "price_t3",
-        "price_t4",
-        "price_t5",
-    ]
-    df_eval = pd.DataFrame(evaluation_list, columns=df_cols)
+    df_eval = pd.DataFrame(obs[:steps], columns=_observation_columns(num_obs))
+    df_eval.insert(0, "action", actions[:steps])
+    df_eval.insert(0, "total_reward", np.cumsum(rewards[:steps]))
+    df_eval.insert(0, "reward", rewards[:steps])
 
     return df_eval
+
+
+def compare_agents(
+    env_config: Dict,
+    agents: Union[Sequence[Agent], Dict[str, Agent]],
+    start_indexes: Sequence[int],
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Evaluate agents side-by-side, each on the same episodes, in parallel processes.
+
+    Every agent runs one episode from each of ``start_indexes``, hence all agents see identical
+    price paths. The (agent, chunk of start indexes) pairs run in worker processes, each with its
+    own environment built from ``env_config`` (but reusing the already-loaded prices). Before each
+    episode, the global ``np.random`` is seeded from ``seed`` and the position of the start index,
+    so the result does not depend on ``max_workers``.
+
+    Args:
+        env_config (Dict): environment configuration.
+        agents (Union[Sequence[Agent], Dict[str, Agent]]): agents by name, or a sequence of agents
+            named after their class.
+        start_indexes (Sequence[int]): start index of the episodes.
+        seed (Optional[int], optional): the seed. Defaults to None, i.e., drawn from the global
+            ``np.random``.
+        max_workers (Optional[int], optional): maximum number of processes, or 1 to run in this
+            process. Defaults to None, i.e., the number of CPUs.
+
+    Returns:
+        pd.DataFrame: one row per (agent, start_index, step), in this order, with columns
+        ``agent`` (categorical), ``start_index``, ``step``, ``reward``, ``total_reward``,
+        ``action``, and the observation of the step.
+    """
+    if not isinstance(agents, dict):
+        names = [type(agent).__name__ for agent in agents]
+        if len(set(names)) < len(names):
+            raise ValueError(f"Agents must have distinct classes, or be named, but getting {names}")
+        agents = dict(zip(names, agents))
+    if not agents:
+        raise ValueError("Agents must not be empty")
+    if len(start_indexes) < 1:
+        raise ValueError("Start indexes must not be empty")
+    if seed is None:
+        seed = int(np.random.randint(2**31))
+
+    env = SimpleBattery(dict(env_config))
+    low, high = env.HIST_PRICE_HORIZON, env.price_length - env.MAX_STEPS_PER_EPISODE
+    starts = np.asarray(start_indexes, dtype=np.int64)
+    if ((starts < low) | (starts >= high)).any():
+        raise ValueError(f"Start indexes must be in [{low}, {high})")
+    episode_seeds = np.random.SeedSequence(seed).generate_state(len(starts)).tolist()
+
+    # A few chunks per worker, to balance the load.
+    workers = max_workers or os.cpu_count() or 1
+    num_chunks = min(len(starts), -(-4 * workers // len(agents)))
+    bounds = np.linspace(0, len(starts), num_chunks + 1).astype(int)
+    args = [
+        (
+            env.env_config,
+            env.df_price,
+            agent,
+            starts[lo:hi].tolist(),
+            episode_seeds[lo:hi],
+        )
+        for agent in agents.values()
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+
+    results = _run_chunks(_evaluate_episodes, args, [len(arg[3]) for arg in args], workers)
+    lengths = [len(result["step"]) for result in results]
+    codes = np.repeat(np.arange(len(args)) // num_chunks, lengths)
+    columns = {"agent": pd.Categorical.from_codes(codes, categories=list(agents))}
+    for name in results[0]:
+        columns[name] = np.concatenate([result[name] for result in results])
+    return pd.DataFrame(columns, copy=False)
+
+
+def _evaluate_episodes(
+    env_config: Dict,
+    df_price: pd.DataFrame,
+    agent: Agent,
+    start_indexes: Sequence[int],
+    seeds: Sequence[int],
+) -> Dict[str, np.ndarray]:
+    """Run some episodes of :func:`compare_agents`, in a worker process."""
+    env = SimpleBattery(dict(env_config), df_price=df_price)
+    # The episode column of the history holds the start index.
+    history = History(
+        env.observation_space.shape[0], len(start_indexes) * env.MAX_STEPS_PER_EPISODE
+    )
+    steps: List[int] = []
+
+    for start_index, seed in zip(start_indexes, seeds):
+        np.random.seed(seed)
+        done = False
+        state = env.reset(start_index)
+        if isinstance(agent, Agent):
+            agent.reset()
+        total_rewards = 0
+        step = 0
+
+        while not done:
+            action = agent.compute_action(state)
+            # Record the observation before env.step(), which may overwrite it (OBS_BUFFER).
+            history.append(start_index, total_rewards, action, state)
+            next_state, reward, done, info = env.step(action)
+            total_rewards += reward
+            history.settle(reward, total_rewards)
+            steps.append(step)
+            state = next_state
+            step += 1
+
+    columns = history.columns
+    return {
+        "start_index": columns.pop("episode"),
+        "step": np.array(steps, dtype=np.int32),
+        **columns,
+    }
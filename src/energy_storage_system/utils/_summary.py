@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from ..envs import SimpleBattery
+
+# Columns of the training history which the summary needs.
+SUMMARY_COLUMNS = ["episode", "total_reward", "action", "energy", "market_electric_price"]
+
+
+def summarize_episodes(df_history: pd.DataFrame, env: SimpleBattery) -> pd.DataFrame:
+    """Compute the metrics of each episode of a training history, in one vectorized pass.
+
+    The energy charged or discharged by each step is derived from its action and its starting
+    ``energy``, with the power ratings and capacity of ``env``, exactly like
+    :meth:`SimpleBattery.step`. Prices are the ``market_electric_price`` observed by the agent when
+    it chose the action.
+
+    Args:
+        df_history (pd.DataFrame): training history with (at least) the columns of
+            ``SUMMARY_COLUMNS``, and the steps of each episode in order.
+        env (SimpleBattery): battery environment, which provides the battery configuration.
+
+    Returns:
+        pd.DataFrame: one row per episode, in order of first appearance, with these columns:
+
+            - episode: the episode.
+            - steps: number of steps.
+            - profit: final total reward ($).
+            - charged_mwh, discharged_mwh: energy bought and sold (MWh).
+            - throughput_mwh: energy charged plus discharged (MWh).
+            - cycles: equivalent full cycles, i.e., throughput over twice the capacity.
+            - avg_buy_price, avg_sell_price: volume-weighted price of the energy bought and sold
+              ($/MWh), NaN without any.
+            - utilization: fraction of steps which charge or discharge.
+            - time_at_min_soc, time_at_max_soc: fraction of steps which start with an empty or a
+              full battery.
+    """
+    action = df_history["action"].to_numpy()
+    energy = df_history["energy"].to_numpy(dtype=np.float64)
+    price = df_history["market_electric_price"].to_numpy(dtype=np.float64)
+
+    charge_pwr = np.minimum(env.MAX_CHARGE_PWR, (env.ENERGY_MAX - energy) / env.DURATION)
+    discharge_pwr = np.minimum(env.MAX_DISCHARGE_PWR, (energy - env.ENERGY_MIN) / env.DURATION)
+    charged = np.where(action == env.CHARGE, charge_pwr * env.DURATION, 0.0)
+    discharged = np.where(action == env.DISCHARGE, discharge_pwr * env.DURATION, 0.0)
+
+    df = pd.DataFrame(
+        {
+            "episode": df_history["episode"].to_numpy(),
+            "profit": df_history["total_reward"].to_numpy(),
+            "charged_mwh": charged,
+            "discharged_mwh": discharged,
+            "buy_cost": charged * price,
+            "sell_revenue": discharged * price,
+            "active": ((charged > 0) | (discharged > 0)).astype(np.float64),
+            "at_min": np.isclose(energy, env.ENERGY_MIN).astype(np.float64),
+            "at_max": np.isclose(energy, env.ENERGY_MAX).astype(np.float64),
+        },
+        copy=False,
+    )
+    summary = df.groupby("episode", sort=False).agg(
+        steps=("profit", "size"),
+        profit=("profit", "last"),
+        charged_mwh=("charged_mwh", "sum"),
+        discharged_mwh=("discharged_mwh", "sum"),
+        buy_cost=("buy_cost", "sum"),
+        sell_revenue=("sell_revenue", "sum"),
+        utilization=("active", "mean"),
+        time_at_min_soc=("at_min", "mean"),
+        time_at_max_soc=("at_max", "mean"),
+    )
+
+    summary["throughput_mwh"] = summary["charged_mwh"] + summary["discharged_mwh"]
+    summary["cycles"] = summary["throughput_mwh"] / (2 * (env.ENERGY_MAX - env.ENERGY_MIN))
+    summary["avg_buy_price"] = (summary["buy_cost"] / summary["charged_mwh"]).where(
+        summary["charged_mwh"] > 0
+    )
+    summary["avg_sell_price"] = (summary["sell_revenue"] / summary["discharged_mwh"]).where(
+        summary["discharged_mwh"] > 0
+    )
+
+    columns = [
+        "steps",
+        "profit",
+        "charged_mwh",
+        "discharged_mwh",
+        "throughput_mwh",
+        "cycles",
+        "avg_buy_price",
+        "avg_sell_price",
+        "utilization",
+        "time_at_min_soc",
+        "time_at_max_soc",
+    ]
+    return summary[columns].reset_index()
@@ -1,7 +1,27 @@
 from ray.tune.registry import register_env
+from ray.tune.utils import get_pinned_object, pin_in_object_store
 from sagemaker_rl.ray_launcher import SageMakerRayLauncher
 
 
+def create_env(env_config):
+    """Create a battery gym environment.
+
+    When ``env_config["PRICE_DATA_ID"]`` is set, the environment attaches to the price series
+    pinned in the Ray object store, instead of loading its own copy from disk or Amazon S3.
+
+    Raises:
+        ValueError: ``env_config["OBS_BUFFER"]`` is set, because RLlib retains observations by
+            reference, which the shared observation buffer would overwrite.
+    """
+    from energy_storage_system.envs import SimpleBattery
+
+    if env_config.get("OBS_BUFFER"):
+        raise ValueError("OBS_BUFFER is not supported under RLlib")
+    price_data_id = env_config.get("PRICE_DATA_ID")
+    df_price = get_pinned_object(price_data_id) if price_data_id is not None else None
+    return SimpleBattery(env_config, df_price=df_price)
+
+
 class MyLauncher(SageMakerRayLauncher):
     """Battery optimization using Ray-RLLib on SageMaker.
 
@@ -16,9 +36,24 @@ class MyLauncher(SageMakerRayLauncher):
 
         See also: :meth:`~sagemaker_rl.ray_launcher.SageMakerRayLauncher.register_env_creator`.
         """
+        register_env("SimpleBattery-v1", create_env)
+
+    def customize_experiment_config(self, config):
+        """Apply hyperparameters, then share the price series with all rollout workers.
+
+        The price series is loaded (and preprocessed) once by the driver, and pinned in the Ray
+        object store. Rollout workers then attach to it rather than each re-reading the .csv or
+        re-downloading it from Amazon S3, and workers on the same node share one copy in memory.
+
+        See also: :meth:`SageMakerRayLauncher.customize_experiment_config`.
+        """
         from energy_storage_system.envs import SimpleBattery
 
-        register_env("SimpleBattery-v1", lambda env_config: SimpleBattery(env_config))
+        config = super().customize_experiment_config(config)
+        env_config = config["training"]["config"].setdefault("env_config", {})
+        df_price = SimpleBattery(dict(env_config)).df_price
+        env_config["PRICE_DATA_ID"] = pin_in_object_store(df_price)
+        return config
 
     def get_experiment_config(self):
         """Get the default configuration, which will be overriden by hyperparameters.
@@ -0,0 +1,83 @@
+"""Throughput benchmarks of the battery environment and the baseline agents.
+
+Run with ``pytest tests/benchmarks --benchmark-json=bench.json``, or ``tox -e benchmark`` which
+also saves the results under ``.benchmarks/`` to compare against with ``--benchmark-compare``.
+"""
+
+import numpy as np
+import pytest
+
+from energy_storage_system.agents import MovingAveragePriceAgent, PriceVsCostAgent, RandomAgent
+from energy_storage_system.envs import SimpleBattery
+from energy_storage_system.utils import train
+
+pytest.importorskip("pytest_benchmark")
+
+AGENTS = {
+    "random": RandomAgent,
+    "price_vs_cost": PriceVsCostAgent,
+    "moving_average": MovingAveragePriceAgent,
+}
+
+
+@pytest.fixture(scope="module")
+def env_config(month_price_csv, tmp_path_factory):
+    return {
+        "LOCAL": True,
+        "FILEPATH": month_price_csv,
+        "PRICE_CACHE_DIR": tmp_path_factory.mktemp("cache"),
+    }
+
+
+@pytest.fixture
+def env(env_config):
+    np.random.seed(0)
+    return SimpleBattery(dict(env_config))
+
+
+@pytest.mark.parametrize("cache", [False, True], ids=["no_cache", "cache"])
+def test_construction(benchmark, env_config, cache):
+    if not cache:
+        env_config = dict(env_config, PRICE_CACHE_DIR=None)
+    benchmark(lambda: SimpleBattery(dict(env_config)))
+
+
+def test_reset(benchmark, env):
+    benchmark(env.reset)
+
+
+@pytest.mark.parametrize(
+    "action",
+    [SimpleBattery.CHARGE, SimpleBattery.DISCHARGE, SimpleBattery.HOLD],
+    ids=["charge", "discharge", "hold"],
+)
+def test_step(benchmark, env, action):
+    """Time of one episode of the same action; steps/s = ``MAX_STEPS_PER_EPISODE`` / time."""
+
+    def run_episode():
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(action)
+
+    benchmark.extra_info["steps"] = env.MAX_STEPS_PER_EPISODE
+    benchmark(run_episode)
+
+
+@pytest.mark.parametrize("agent_name", list(AGENTS))
+def test_episode(benchmark, env, agent_name):
+    agent = AGENTS[agent_name]()
+
+    def run_episode():
+        state = env.reset()
+        done = False
+        while not done:
+            state, _, done, _ = env.step(agent.compute_action(state))
+
+    benchmark.extra_info["steps"] = env.MAX_STEPS_PER_EPISODE
+    benchmark(run_episode)
+
+
+def test_train(benchmark, env):
+    benchmark.extra_info["episodes"] = 100
+    benchmark.pedantic(train, args=(env, PriceVsCostAgent(), 100), rounds=3)
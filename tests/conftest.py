@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def write_price_csv(fname, days):
+    """Write a synthetic, 5-minute AEMO price-and-demand file."""
+    rng = np.random.RandomState(0)
+    n = 12 * 24 * days
+    settlement_date = pd.date_range("2021/03/01 00:05", periods=n, freq="5min")
+    daily_cycle = 30 * np.sin(np.arange(n) / 288 * 2 * np.pi)
+    df = pd.DataFrame(
+        {
+            "REGION": "NSW1",
+            "SETTLEMENTDATE": settlement_date.strftime("%Y/%m/%d %H:%M:%S"),
+            "TOTALDEMAND": rng.uniform(6000, 9000, n).round(2),
+            "RRP": (50 + daily_cycle + rng.normal(0, 10, n)).round(2),
+            "PERIODTYPE": "TRADE",
+        }
+    )
+    df.to_csv(fname, index=False)
+    return fname
+
+
+@pytest.fixture
+def price_csv(tmp_path):
+    """A synthetic 20-day price file."""
+    return write_price_csv(tmp_path / "PRICE_AND_DEMAND_202103_NSW1.csv", days=20)
+
+
+@pytest.fixture
+def env_config(price_csv, tmp_path):
+    return {"LOCAL": True, "FILEPATH": price_csv, "PRICE_CACHE_DIR": tmp_path / "cache"}
+
+
+@pytest.fixture(scope="session")
+def month_price_csv(tmp_path_factory):
+    """A synthetic price file as long as one monthly AEMO file."""
+    fname = tmp_path_factory.mktemp("data") / "PRICE_AND_DEMAND_202103_NSW1.csv"
+    return write_price_csv(fname, days=31)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from energy_storage_system.agents import (
+    Agent,
+    MovingAveragePriceAgent,
+    PriceVsCostAgent,
+    RandomAgent,
+    StreamingMovingAveragePriceAgent,
+)
+from energy_storage_system.envs import SimpleBattery
+
+
+class ThresholdAgent(Agent):
+    def compute_action(self, state) -> int:
+        return SimpleBattery.DISCHARGE if state[2] > 50 else SimpleBattery.CHARGE
+
+
+@pytest.fixture
+def states():
+    rng = np.random.default_rng(0)
+    states = rng.uniform(0, 100, size=(200, 3 + 12))
+    # Ties between price and cost must map to HOLD.
+    states[:10, 1] = states[:10, 2]
+    return states
+
+
+@pytest.mark.parametrize(
+    "agent",
+    [PriceVsCostAgent(), MovingAveragePriceAgent(), MovingAveragePriceAgent(5), ThresholdAgent()],
+)
+def test_compute_actions_matches_compute_action(agent, states):
+    expected = [agent.compute_action(state) for state in states]
+
+    assert agent.compute_actions(states).tolist() == expected
+
+
+def test_random_agent_compute_actions(states):
+    actions = RandomAgent().compute_actions(states)
+
+    assert actions.shape == (len(states),)
+    assert set(actions.tolist()) <= set(RandomAgent.actions)
+
+
+def naive_moving_average_actions(prices, window, alpha=None):
+    """Actions of a streaming moving-average agent, recomputing the average at every step."""
+    actions = []
+    ema = None
+    for t in range(1, len(prices)):
+        past = prices[:t]
+        if alpha is None:
+            average = sum(past[-window:]) / len(past[-window:])
+        else:
+            ema = past[0] if ema is None else ema + alpha * (past[-1] - ema)
+            average = ema
+        actions.append(
+            SimpleBattery.DISCHARGE
+            if prices[t] > average
+            else SimpleBattery.CHARGE if prices[t] < average else SimpleBattery.HOLD
+        )
+    return actions
+
+
+@pytest.mark.parametrize("window, alpha", [(3, None), (30, None), (30, 0.1)])
+def test_streaming_moving_average(env_config, window, alpha):
+    env = SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=48, SEED=0))
+    agent = StreamingMovingAveragePriceAgent(window, alpha)
+
+    for _ in range(2):
+        state = env.reset()
+        agent.reset()
+        prices = state[3:][::-1]
+        actions = []
+        done = False
+        while not done:
+            prices.append(state[2])
+            actions.append(agent.compute_action(state))
+            state, _, done, _ = env.step(actions[-1])
+
+        expected = naive_moving_average_actions(prices, window, alpha)[-48:]
+        assert actions == expected
+
+
+def test_streaming_moving_average_batch(states):
+    batch_agent = StreamingMovingAveragePriceAgent(window=8)
+    batch_actions = np.stack([batch_agent.compute_actions(states[i : i + 20]) for i in range(5)])
+
+    for row in range(20):
+        agent = StreamingMovingAveragePriceAgent(window=8)
+        actions = [agent.compute_action(states[i + row]) for i in range(5)]
+        assert batch_actions[:, row].tolist() == actions
+
+    with pytest.raises(ValueError):
+        batch_agent.compute_actions(states[:3])
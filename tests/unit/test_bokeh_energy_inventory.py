@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from energy_storage_system.agents import PriceVsCostAgent
+from energy_storage_system.envs import SimpleBattery
+from energy_storage_system.utils import ReportIO, evaluate_episode
+
+pytest.importorskip("pandas_bokeh")
+from energy_storage_system.bokeh_energy_inventory import load_energy_inventories  # noqa: E402
+
+
+def test_load_energy_inventories(env_config, tmp_path, capsys):
+    env = SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24, SEED=0))
+    lengths = {"b": 24, "a": 10}
+    for name, length in lengths.items():
+        df_history = evaluate_episode(PriceVsCostAgent(), env).iloc[:length]
+        ReportIO(tmp_path / name).save2([0.0], df_history, render="lazy")
+    (tmp_path / "empty").mkdir()
+    (tmp_path / ".DS_Store").touch()
+
+    df = load_energy_inventories(tmp_path, max_workers=2)
+
+    assert list(df.columns) == ["a", "b"]
+    assert len(df) == 24
+    assert df["a"].iloc[10:].isna().all()
+    np.testing.assert_array_equal(
+        df["b"].to_numpy(), ReportIO(tmp_path / "b").load_history(["energy"])["energy"]
+    )
+    out = capsys.readouterr().out
+    assert "empty: no training history" in out
+    assert ".DS_Store: not a directory" in out
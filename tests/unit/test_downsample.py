@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from energy_storage_system.utils import bucket_counts, downsample_minmax
+
+
+def test_downsample_minmax():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.normal(size=100_000), "b": rng.normal(size=100_000)})
+    df.loc[12_345, "a"] = 100.0
+
+    result = downsample_minmax(df, max_points=1000)
+
+    assert len(result) <= 1000
+    assert result.index.is_monotonic_increasing
+    assert result["a"].max() == 100.0
+    assert result["b"].min() == df["b"].min()
+    assert result.index[0] == 0 and result.index[-1] == len(df) - 1
+    assert len(downsample_minmax(df.iloc[:500], max_points=1000)) == 500
+
+
+def test_bucket_counts():
+    actions = pd.Series(np.tile([0, 0, 1, 2], 25_000), name="action")
+
+    counts = bucket_counts(actions, max_points=300)
+
+    assert counts.size <= 300
+    assert counts.to_numpy().sum() == len(actions)
+    assert list(counts.columns) == [0, 1, 2]
+    assert counts.index[0] == 0
+    assert (counts[0] == 2 * counts[1]).all()
@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from energy_storage_system.envs import SimpleBattery, VectorSimpleBattery
+
+
+def start_indexes(env, n):
+    """Start indexes of the next ``n`` episodes."""
+    indexes = []
+    for _ in range(n):
+        env.reset()
+        indexes.append(env.index)
+    return indexes
+
+
+@pytest.fixture
+def env(env_config):
+    return SimpleBattery(env_config)
+
+
+def test_price_buffer(env):
+    assert env.prices.dtype == np.float64
+    assert env.prices.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(env.prices, env.df_price["price"].to_numpy())
+
+
+def test_observation_from_price_buffer(env):
+    np.random.seed(0)
+    prices = env.df_price["price"]
+    states = [(env.reset(), env.index)]
+    for action in (SimpleBattery.CHARGE, SimpleBattery.DISCHARGE, SimpleBattery.HOLD):
+        # The observation returned by step() is for the index the action was taken at.
+        states.append((env.step(action)[0], env.index - 1))
+
+    for state, i in states:
+        assert state[2] == prices.iloc[i]
+        assert state[3:] == prices.iloc[i - env.HIST_PRICE_HORIZON : i][::-1].to_list()
+
+
+def test_vector_env_matches_scalar_envs(env_config):
+    env_config = dict(env_config, MAX_STEPS_PER_EPISODE=24)
+    num_envs = 4
+    vector_env = VectorSimpleBattery(SimpleBattery(env_config), num_envs=num_envs)
+    envs = [SimpleBattery(env_config) for _ in range(num_envs)]
+    actions = np.random.RandomState(1).randint(0, 3, size=(3 * 24, num_envs))
+
+    np.random.seed(0)
+    states = vector_env.reset()
+    assert states.shape == vector_env.observation_space.shape == (num_envs, 8)
+    assert vector_env.action_space.shape == (num_envs,)
+    results = [vector_env.step(a)[:3] for a in actions]
+
+    np.random.seed(0)
+    expected_states = np.array([env.reset() for env in envs])
+    np.testing.assert_array_equal(states, expected_states)
+    for a, (states, rewards, dones) in zip(actions, results):
+        steps = [env.step(action) for env, action in zip(envs, a)]
+        for j, env in enumerate(envs):
+            if steps[j][2]:
+                steps[j] = (env.reset(),) + steps[j][1:]
+        np.testing.assert_array_equal(states, np.array([s[0] for s in steps]))
+        np.testing.assert_array_equal(rewards, [s[1] for s in steps])
+        np.testing.assert_array_equal(dones, [s[2] for s in steps])
+
+
+def test_vector_env_reset_start_indexes(env_config):
+    env = SimpleBattery(env_config)
+    vector_env = VectorSimpleBattery(env, num_envs=3)
+    states = vector_env.reset([100, 5, 200])
+
+    np.testing.assert_array_equal(vector_env.index, [100, 5, 200])
+    np.testing.assert_array_equal(states, [env.reset(i) for i in (100, 5, 200)])
+    with pytest.raises(ValueError):
+        vector_env.reset([100, 5])
+    with pytest.raises(ValueError):
+        vector_env.reset([100, 4, 200])
+
+
+def test_observation_buffer(env_config):
+    env = SimpleBattery(env_config)
+    buffered_env = SimpleBattery(dict(env_config, OBS_BUFFER=True))
+
+    np.random.seed(0)
+    states = [env.reset()] + [env.step(a)[0] for a in (0, 1, 2)]
+    np.random.seed(0)
+    buffered_state = buffered_env.reset()
+    assert buffered_state.shape == buffered_env.observation_space.shape
+    assert buffered_state.dtype == buffered_env.observation_space.dtype
+    np.testing.assert_array_equal(buffered_state, states[0])
+    for action, state in zip((0, 1, 2), states[1:]):
+        obs = buffered_env.step(action)[0]
+        assert obs is buffered_state
+        np.testing.assert_array_equal(obs, state)
+
+
+def test_seed(env_config):
+    env = SimpleBattery(dict(env_config, SEED=1))
+    other_env = SimpleBattery(env_config)
+    other_env.seed(1)
+
+    starts = []
+    for _ in range(5):
+        np.random.seed(None)
+        env.reset()
+        other_env.reset()
+        assert env.index == other_env.index
+        starts.append(env.index)
+
+    env.seed(1)
+    assert start_indexes(env, 5) == starts
+
+
+@pytest.mark.parametrize("schedule, stride", [("sweep", 1), ("stratified", 24)])
+def test_start_schedule(env_config, schedule, stride):
+    env = SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24, START_SCHEDULE=schedule))
+    low, high = env.HIST_PRICE_HORIZON, env.price_length - env.MAX_STEPS_PER_EPISODE
+    expected = list(range(low, high, stride))
+    if expected[-1] != high - 1:
+        expected.append(high - 1)
+    assert env.num_scheduled_starts == len(expected)
+
+    # Every price that an episode can reach is in at least one scheduled episode.
+    covered = np.zeros(env.price_length, dtype=bool)
+    for start in expected:
+        covered[start : start + env.MAX_STEPS_PER_EPISODE] = True
+    assert covered[low : env.price_length - 1].all()
+
+    # One pass covers the schedule exactly once, then the schedule restarts.
+    assert start_indexes(env, len(expected) + 1) == expected + expected[:1]
+
+
+def test_invalid_start_schedule(env_config):
+    with pytest.raises(ValueError):
+        SimpleBattery(dict(env_config, START_SCHEDULE="foo"))
+
+
+@pytest.mark.parametrize("schedule", ["sweep", "stratified"])
+def test_empty_start_schedule(env_config, schedule):
+    with pytest.raises(ValueError, match="START_SCHEDULE"):
+        SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=10000, START_SCHEDULE=schedule))
+
+
+def test_reset_start_index(env_config):
+    env = SimpleBattery(dict(env_config, START_SCHEDULE="sweep"))
+    state = env.reset(100)
+
+    assert env.index == 100
+    assert state[2] == env.prices[100]
+    # An explicit start index does not consume the schedule.
+    env.reset()
+    assert env.index == env.HIST_PRICE_HORIZON
+
+    with pytest.raises(ValueError):
+        env.reset(env.price_length)
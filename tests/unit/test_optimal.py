@@ -0,0 +1,73 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from energy_storage_system.agents import PriceVsCostAgent
+from energy_storage_system.envs import SimpleBattery
+from energy_storage_system.optimal import solve_perfect_foresight
+
+
+def replay(env, start_index, actions):
+    """Total reward of an episode of ``env`` under a fixed action sequence."""
+    env.reset()
+    env.index = start_index
+    return sum(env.step(int(action))[1] for action in actions)
+
+
+@pytest.mark.parametrize("starting_energy", [4.0, 40.0])
+def test_solve_perfect_foresight_small(env_config, starting_energy):
+    steps = 6
+    env_config = dict(
+        env_config,
+        MAX_STEPS_PER_EPISODE=steps,
+        STARTING_ENERGY=starting_energy,
+    )
+    env = SimpleBattery(env_config)
+    starts = np.arange(env.HIST_PRICE_HORIZON, env.HIST_PRICE_HORIZON + 10)
+    result = solve_perfect_foresight(env, starts)
+
+    assert not np.isnan(result.upper_bounds).any()
+    for start, reward, actions, upper_bound in zip(
+        starts, result.rewards, result.actions, result.upper_bounds
+    ):
+        # The solution is exactly what the environment pays...
+        assert replay(env, start, actions) == reward
+        # ... and no action sequence does better.
+        best = max(
+            replay(env, start, candidate)
+            for candidate in itertools.product(
+                [SimpleBattery.CHARGE, SimpleBattery.DISCHARGE, SimpleBattery.HOLD], repeat=steps
+            )
+        )
+        assert reward <= best + 1e-9
+        assert reward >= best - 0.05 * abs(best)
+        # The upper bound is never below the true optimum.
+        assert upper_bound >= best - 1e-9
+
+
+def test_solve_perfect_foresight_beats_heuristic(env_config):
+    env = SimpleBattery(dict(env_config, START_SCHEDULE="stratified"))
+    result = solve_perfect_foresight(env, env._schedule)
+
+    agent = PriceVsCostAgent()
+    for reward, upper_bound in zip(result.rewards, result.upper_bounds):
+        state, done, total = env.reset(), False, 0
+        while not done:
+            state, step_reward, done, _ = env.step(agent.compute_action(state))
+            total += step_reward
+        assert reward >= total
+        assert upper_bound >= reward
+
+
+def test_solve_perfect_foresight_inexact_grid(env_config):
+    env = SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=6))
+    result = solve_perfect_foresight(env, [10, 20], levels=7)
+    # Transitions are rounded to the grid, hence there is no valid upper bound.
+    assert np.isnan(result.upper_bounds).all()
+
+
+def test_solve_perfect_foresight_invalid_start(env_config):
+    env = SimpleBattery(env_config)
+    with pytest.raises(ValueError):
+        solve_perfect_foresight(env, [0])
@@ -0,0 +1,148 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_storage_system import prices
+
+
+@pytest.fixture
+def expected(price_csv):
+    return prices.preprocess(pd.read_csv(price_csv))
+
+
+def test_load_csv_cache(price_csv, tmp_path, expected, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    pd.testing.assert_frame_equal(prices.load_csv(price_csv, cache_dir=cache_dir), expected)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # Cache hits: as-is, and after touching the source file without modifying it.
+    monkeypatch.setattr(prices, "preprocess", None)
+    pd.testing.assert_frame_equal(prices.load_csv(price_csv, cache_dir=cache_dir), expected)
+    os.utime(price_csv, ns=(0, 0))
+    df = prices.load_csv(price_csv, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(df, expected)
+
+    # Hits are backed by the memory-mapped cache entry, not by in-memory copies.
+    for arr in (df["price"].to_numpy(), df.index.to_numpy()):
+        assert _is_memmap(arr)
+
+
+def _is_memmap(arr):
+    while arr is not None:
+        if isinstance(arr, np.memmap):
+            return True
+        arr = arr.base
+    return False
+
+
+def test_load_csv_cache_invalidation(price_csv, tmp_path, expected):
+    cache_dir = tmp_path / "cache"
+    prices.load_csv(price_csv, cache_dir=cache_dir)
+
+    # Different preprocessing parameters.
+    df = prices.load_csv(price_csv, resample_rule="30min", cache_dir=cache_dir)
+    assert len(df) > len(expected)
+
+    # Modified source file.
+    df_raw = pd.read_csv(price_csv)
+    df_raw["RRP"] /= 2
+    df_raw.to_csv(price_csv, index=False)
+    df = prices.load_csv(price_csv, cache_dir=cache_dir)
+    assert len(df) == len(expected)
+    pd.testing.assert_series_equal(df["price"], expected["price"] / 2, check_exact=False)
+
+
+def test_load_many(price_csv, tmp_path, expected):
+    # Split into monthly-like files at hour boundaries, each file with two regions.
+    df_raw = pd.read_csv(price_csv)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    bounds = [0, 11 + 12 * 100, 11 + 12 * 300, len(df_raw)]
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        df_part = df_raw.iloc[start:end]
+        df_other = df_part.assign(REGION="VIC1", RRP=df_part["RRP"] + 1000)
+        pd.concat([df_part, df_other]).to_csv(data_dir / f"part{i}.csv", index=False)
+    (data_dir / "manifest.txt").write_text("# Parts\npart0.csv\npart1.csv\n\npart2.csv\n")
+
+    for sources in (data_dir / "part*.csv", data_dir / "manifest.txt"):
+        for cache_dir in (None, tmp_path / "cache", tmp_path / "cache"):
+            df = prices.load_many(sources, cache_dir=cache_dir, region="NSW1", max_workers=2)
+            pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+
+def test_load_many_regions(price_csv, tmp_path, expected):
+    df_raw = pd.read_csv(price_csv)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    df_raw.to_csv(data_dir / "PRICE_AND_DEMAND_NSW1.csv", index=False)
+    df_raw.assign(REGION="VIC1").to_csv(data_dir / "PRICE_AND_DEMAND_VIC1.csv", index=False)
+
+    # Without a region, prices of different regions must not be mixed.
+    with pytest.raises(ValueError, match="regions"):
+        prices.load_many(data_dir / "*.csv", cache_dir=None, max_workers=1)
+
+    # A single region needs none.
+    df = prices.load_many(data_dir / "*NSW1.csv", cache_dir=None, max_workers=1)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_load_many_regions_cache(price_csv, tmp_path, expected, monkeypatch):
+    df_raw = pd.read_csv(price_csv)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for i in range(2):
+        df_raw.to_csv(data_dir / f"part{i}.csv", index=False)
+    df_raw.assign(REGION="VIC1").to_csv(data_dir / "other.csv", index=False)
+    cache_dir = tmp_path / "cache"
+    df = prices.load_many(data_dir / "part*.csv", cache_dir=cache_dir, max_workers=1)
+
+    # Warm cache: regions come from the cache entries, and the raw files are never read.
+    def read_csv(*args, **kwargs):
+        raise AssertionError("Raw price file read despite a valid cache entry")
+
+    monkeypatch.setattr(pd, "read_csv", read_csv)
+    pd.testing.assert_frame_equal(
+        prices.load_many(data_dir / "part*.csv", cache_dir=cache_dir, max_workers=1), df
+    )
+    pd.testing.assert_frame_equal(
+        prices.load_many(data_dir / "part0.csv", cache_dir=cache_dir, max_workers=1),
+        expected,
+    )
+
+    # Cached and uncached files of different regions must not be mixed either.
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="regions"):
+        prices.load_many(data_dir / "*.csv", cache_dir=cache_dir, max_workers=1)
+
+
+class FakeS3Client:
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = 0
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": '"%s"' % hash(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, IfMatch=None):
+        self.downloads += 1
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+def test_load_s3(price_csv, tmp_path, expected, monkeypatch):
+    s3_client = FakeS3Client({("bucket", "prefix/prices.csv"): price_csv.read_bytes()})
+    monkeypatch.setattr(prices, "_s3_client", lambda pid: s3_client)
+
+    for _ in range(3):
+        df = prices.load_s3("bucket", "prefix/prices.csv", cache_dir=tmp_path / "cache")
+        pd.testing.assert_frame_equal(df, expected)
+    assert s3_client.downloads == 1
+
+    # New object version.
+    s3_client.objects[
+        ("bucket", "prefix/prices.csv")
+    ] += b"NSW1,2021/04/01 00:05:00,7000.0,50.0,TRADE\n"
+    prices.load_s3("bucket", "prefix/prices.csv", cache_dir=tmp_path / "cache")
+    assert s3_client.downloads == 2
@@ -0,0 +1,116 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_storage_system.agents import PriceVsCostAgent
+from energy_storage_system.envs import SimpleBattery
+from energy_storage_system.utils import (
+    ANALYSIS_COLUMNS,
+    ReportIO,
+    evaluate_episode,
+    plot_analysis,
+    train,
+)
+
+matplotlib.use("Agg")
+
+
+@pytest.fixture
+def env(env_config):
+    return SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24, SEED=0))
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_history_writer(env, tmp_path, format):
+    expected = train(env, PriceVsCostAgent(), episodes=7)
+    env.seed(0)
+    report_io = ReportIO(tmp_path / "report")
+    result = train(
+        env, PriceVsCostAgent(), episodes=7, sink=report_io.history_writer(format), flush_every=3
+    )
+
+    assert result.history is None
+    assert result.rewards_list == expected.rewards_list
+    chunks = list(report_io.iter_history(columns=["episode", "action"]))
+    assert [len(chunk) for chunk in chunks] == [3 * 24, 3 * 24, 24]
+    assert list(chunks[0].columns) == ["episode", "action"]
+
+    report = report_io.load()
+    assert report.df_history.equals(expected.history.to_frame())
+    assert report.rewards_list == expected.rewards_list
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow", "csv"])
+def test_report_io_formats(env, tmp_path, format):
+    df_history = evaluate_episode(PriceVsCostAgent(), env)
+    rewards_list = [1.5, 2.0, -0.5]
+    ReportIO(tmp_path, format).save2(rewards_list, df_history, close_fig=True)
+
+    # The format is detected on load.
+    report = ReportIO(tmp_path).load()
+    assert report.rewards_list == rewards_list
+    if format == "csv":
+        # CSV does not round-trip floats exactly.
+        pd.testing.assert_frame_equal(report.df_history, df_history, check_dtype=False)
+    else:
+        pd.testing.assert_frame_equal(report.df_history, df_history, check_exact=True)
+
+    report = ReportIO(tmp_path).load(columns=["energy", "action"])
+    assert list(report.df_history.columns) == ["energy", "action"]
+
+
+def test_report_io_replaces_legacy_csv(env, tmp_path):
+    df_history = evaluate_episode(PriceVsCostAgent(), env)
+    ReportIO(tmp_path, "csv").save2([1.0], df_history, close_fig=True)
+    ReportIO(tmp_path).save2([2.0], df_history.iloc[:10], close_fig=True)
+
+    assert not (tmp_path / "df_history.csv").exists()
+    assert not (tmp_path / "rewards_list.json").exists()
+    report = ReportIO(tmp_path).load()
+    assert report.rewards_list == [2.0]
+    assert len(report.df_history) == 10
+
+
+def test_plot_analysis_downsamples(env):
+    df_history = pd.concat([evaluate_episode(PriceVsCostAgent(), env) for _ in range(50)])
+    df_history["episode"] = np.repeat(np.arange(50), 24)
+    df_history = df_history.reset_index(drop=True)
+
+    fig = plot_analysis(df_history, max_points=200)
+    assert all(len(line.get_xdata()) <= 200 for ax in fig.axes for line in ax.lines)
+
+    # A single episode is plotted at full resolution.
+    fig = plot_analysis(df_history, episode=[3], max_points=200)
+    assert len(fig.axes[-1].lines[0].get_xdata()) == 24
+
+
+def test_save2_deferred_rendering(env, tmp_path):
+    df_history = evaluate_episode(PriceVsCostAgent(), env)
+    report_io = ReportIO(tmp_path)
+
+    report_io.save2([1.0, 2.0], df_history, render="lazy")
+    assert not (tmp_path / "reward.png").exists()
+    assert not (tmp_path / "analysis.png").exists()
+
+    assert report_io.figure_path("analysis").exists()
+    assert not (tmp_path / "reward.png").exists()
+    report_io.render()
+    assert (tmp_path / "reward.png").exists()
+
+    future = report_io.save2([1.0, 2.0], df_history, render="background")
+    assert future is not None
+    future.result()
+    assert (tmp_path / "reward.png").exists()
+    assert (tmp_path / "analysis.png").exists()
+
+
+def test_render_sink_report(env, tmp_path):
+    report_io = ReportIO(tmp_path)
+    train(env, PriceVsCostAgent(), episodes=3, sink=report_io.history_writer(), flush_every=2)
+
+    report_io.render()
+    assert (tmp_path / "reward.png").exists()
+    assert (tmp_path / "analysis.png").exists()
+    report = report_io.load(columns=ANALYSIS_COLUMNS)
+    assert list(report.df_history.columns) == ANALYSIS_COLUMNS
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from energy_storage_system.agents import (
+    MovingAveragePriceAgent,
+    PriceVsCostAgent,
+    RandomAgent,
+    StreamingMovingAveragePriceAgent,
+)
+from energy_storage_system.envs import SimpleBattery
+from energy_storage_system.utils import (
+    History,
+    compare_agents,
+    evaluate_episode,
+    fast_train,
+    parallel_train,
+    train,
+)
+
+
+@pytest.fixture
+def env(env_config):
+    return SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24))
+
+
+@pytest.mark.parametrize(
+    "agent",
+    [PriceVsCostAgent(), MovingAveragePriceAgent(3), StreamingMovingAveragePriceAgent(48)],
+)
+def test_fast_train_matches_train(env, agent):
+    np.random.seed(0)
+    expected = train(env, agent, episodes=20)
+    np.random.seed(0)
+    result = fast_train(env, agent, episodes=20)
+
+    assert result.rewards_list == expected.rewards_list
+    assert result.history_list == expected.history_list
+
+
+def test_fast_train_random_agent(env):
+    result = fast_train(env, RandomAgent(), episodes=5)
+
+    assert len(result.rewards_list) == 5
+    assert len(result.history_list) == 5 * env.MAX_STEPS_PER_EPISODE
+
+
+def test_parallel_train(env_config):
+    env_config = dict(env_config, MAX_STEPS_PER_EPISODE=24)
+    serial = parallel_train(env_config, RandomAgent(), episodes=10, seed=1, max_workers=1)
+    parallel = parallel_train(env_config, RandomAgent(), episodes=10, seed=1, max_workers=3)
+
+    assert parallel.rewards_list == serial.rewards_list
+    assert parallel.history_list == serial.history_list
+    assert [row[0] for row in serial.history_list] == np.repeat(np.arange(10), 24).tolist()
+
+    other = parallel_train(env_config, RandomAgent(), episodes=10, seed=2, max_workers=1)
+    assert other.rewards_list != serial.rewards_list
+
+    buffered = parallel_train(
+        dict(env_config, OBS_BUFFER=True), RandomAgent(), episodes=10, seed=1, max_workers=1
+    )
+    assert buffered.history_list == serial.history_list
+
+
+@pytest.mark.parametrize("obs_buffer", [False, True])
+def test_compare_agents(env_config, obs_buffer):
+    env_config = dict(env_config, MAX_STEPS_PER_EPISODE=24, OBS_BUFFER=obs_buffer)
+    agents = [PriceVsCostAgent(), RandomAgent()]
+    start_indexes = [100, 7, 250]
+    serial = compare_agents(env_config, agents, start_indexes, seed=1, max_workers=1)
+    parallel = compare_agents(env_config, agents, start_indexes, seed=1, max_workers=3)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert list(serial.columns[:6]) == [
+        "agent",
+        "start_index",
+        "step",
+        "reward",
+        "total_reward",
+        "action",
+    ]
+    assert list(serial["agent"].cat.categories) == ["PriceVsCostAgent", "RandomAgent"]
+    assert serial["start_index"].tolist() == np.tile(np.repeat(start_indexes, 24), 2).tolist()
+    assert serial["step"].tolist() == np.tile(np.arange(24), 6).tolist()
+
+    # Every agent sees the same price path from each start index.
+    prices = serial.pivot_table("market_electric_price", ["start_index", "step"], "agent")
+    assert (prices["PriceVsCostAgent"] == prices["RandomAgent"]).all()
+
+    # Same episode as running the agent by hand.
+    env = SimpleBattery(dict(env_config))
+    state, total_reward, energy = env.reset(250), 0.0, []
+    for _ in range(24):
+        energy.append(state[0])
+        state, reward, done, _ = env.step(PriceVsCostAgent().compute_action(state))
+        total_reward += reward
+    episode = serial[(serial["agent"] == "PriceVsCostAgent") & (serial["start_index"] == 250)]
+    assert episode["energy"].tolist() == energy
+    assert episode["energy"].iloc[0] == env.STARTING_ENERGY
+    assert episode["total_reward"].iloc[-1] == pytest.approx(total_reward)
+    assert episode["reward"].sum() == pytest.approx(total_reward)
+
+    with pytest.raises(ValueError):
+        compare_agents(env_config, [RandomAgent(), RandomAgent()], start_indexes)
+    with pytest.raises(ValueError):
+        compare_agents(env_config, agents, [0])
+
+
+@pytest.mark.parametrize("horizon", [5, 48])
+@pytest.mark.parametrize("obs_buffer", [False, True])
+def test_evaluate_episode(env_config, horizon, obs_buffer):
+    env_config = dict(
+        env_config, MAX_STEPS_PER_EPISODE=24, HIST_PRICE_HORIZON=horizon, OBS_BUFFER=obs_buffer
+    )
+    env = SimpleBattery(dict(env_config, SEED=0))
+    df = evaluate_episode(PriceVsCostAgent(), env)
+
+    assert list(df.columns[:4]) == ["reward", "total_reward", "action", "energy"]
+    assert list(df.columns[-2:]) == [f"price_t{horizon - 1}", f"price_t{horizon}"]
+    assert df.shape == (24, 6 + horizon)
+    assert df["action"].dtype == np.int64
+
+    env = SimpleBattery(dict(env_config, SEED=0))
+    state, rows, total_reward = env.reset(), [], 0
+    for _ in range(24):
+        action = PriceVsCostAgent().compute_action(state)
+        row = list(state)
+        state, reward, done, _ = env.step(action)
+        total_reward += reward
+        rows.append([reward, total_reward, action] + row)
+    assert df.values.tolist() == rows
+
+
+@pytest.mark.parametrize("obs_buffer", [False, True])
+def test_history(env_config, obs_buffer):
+    env = SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24, SEED=0, OBS_BUFFER=obs_buffer))
+    result = train(env, PriceVsCostAgent(), episodes=3)
+    history = result.history
+    assert len(history) == 3 * 24
+    # Each row holds the observation on which the action was taken.
+    assert (history.obs[::24, 0] == env.STARTING_ENERGY).all()
+    expected = train(
+        SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24, SEED=0)),
+        PriceVsCostAgent(),
+        episodes=3,
+    )
+    assert result.history_list == expected.history_list
+
+    df = history.to_frame()
+    assert list(df.columns[:5]) == ["episode", "reward", "total_reward", "action", "energy"]
+    assert df.columns[-1] == f"price_t{env.HIST_PRICE_HORIZON}"
+    assert df["action"].dtype == np.int8
+    assert df.drop(columns="reward").values.tolist() == result.history_list
+    assert df.groupby("episode")["reward"].sum().tolist() == pytest.approx(result.rewards_list)
+
+    # Growing the buffers keeps the recorded rows.
+    grown = History(history.num_obs, capacity=1)
+    for row in result.history_list:
+        grown.append(row[0], row[1], row[2], row[3:])
+    assert grown.to_list() == result.history_list
+
+
+def test_history_to_arrow(env):
+    history = train(env, PriceVsCostAgent(), episodes=2).history
+
+    table = history.to_arrow()
+    assert isinstance(table, pa.Table)
+    assert table.to_pandas().equals(history.to_frame())
+
+
+def test_train_sink(env):
+    chunks = []
+    result = train(env, PriceVsCostAgent(), episodes=5, sink=chunks.append, flush_every=2)
+
+    assert result.history is None
+    assert [len(chunk) for chunk in chunks] == [2 * 24, 2 * 24, 24]
+    assert chunks[-1].episode.tolist() == [4] * 24
+
+
+def test_train_duck_typed_policy(env):
+    class Policy:
+        """A policy without Agent.reset(), e.g., a restored RLlib trainer."""
+
+        def compute_action(self, state):
+            return SimpleBattery.HOLD
+
+    result = train(env, Policy(), episodes=2)
+    assert result.rewards_list == [0.0, 0.0]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_storage_system.agents import RandomAgent
+from energy_storage_system.envs import SimpleBattery
+from energy_storage_system.utils import ReportIO, summarize_episodes, train
+
+
+@pytest.fixture
+def env(env_config):
+    return SimpleBattery(dict(env_config, MAX_STEPS_PER_EPISODE=24, SEED=0))
+
+
+def test_summarize_episodes(env):
+    np.random.seed(0)
+    result = train(env, RandomAgent(), episodes=5)
+    df_history = result.history.to_frame()
+    summary = summarize_episodes(df_history, env)
+
+    assert summary["episode"].tolist() == list(range(5))
+    assert (summary["steps"] == 24).all()
+    assert summary["profit"].tolist() == result.rewards_list
+
+    # Energy deltas match the energy levels observed at the next steps.
+    episode = df_history[df_history["episode"] == 2]
+    delta = np.diff(episode["energy"].to_numpy())
+    row = summarize_episodes(episode.iloc[:-1], env).iloc[0]
+    assert row["charged_mwh"] == pytest.approx(delta[delta > 0].sum())
+    assert row["discharged_mwh"] == pytest.approx(-delta[delta < 0].sum())
+    assert row["throughput_mwh"] == pytest.approx(np.abs(delta).sum())
+    assert row["cycles"] == pytest.approx(np.abs(delta).sum() / 160.0)
+    assert row["utilization"] == pytest.approx((delta != 0).mean())
+
+
+def test_summarize_episodes_prices(env):
+    df_history = pd.DataFrame(
+        {
+            "episode": [0, 0, 0, 0, 1],
+            "total_reward": [-4.0, -8.0, -8.0, 100.0, 0.0],
+            "action": [env.CHARGE, env.CHARGE, env.HOLD, env.DISCHARGE, env.HOLD],
+            "energy": [78.0, 80.0, 80.0, 80.0, 0.0],
+            "market_electric_price": [10.0, 20.0, 30.0, 90.0, 50.0],
+        }
+    )
+    summary = summarize_episodes(df_history, env)
+
+    assert summary["charged_mwh"].tolist() == [2.0, 0.0]
+    assert summary["discharged_mwh"].tolist() == [2.0, 0.0]
+    assert summary["avg_buy_price"].iloc[0] == 10.0
+    assert summary["avg_sell_price"].iloc[0] == 90.0
+    assert summary["avg_buy_price"].isna().tolist() == [False, True]
+    assert summary["utilization"].tolist() == [0.5, 0.0]
+    assert summary["time_at_max_soc"].tolist() == [0.75, 0.0]
+    assert summary["time_at_min_soc"].tolist() == [0.0, 1.0]
+
+
+def test_report_io_summary(env, tmp_path):
+    result = train(env, RandomAgent(), episodes=3)
+    report_io = ReportIO(tmp_path / "report")
+    report_io.save2(result.rewards_list, result.history.to_frame(), render="lazy")
+    with pytest.raises(FileNotFoundError):
+        report_io.load_summary()
+
+    summary = report_io.summarize(env)
+    pd.testing.assert_frame_equal(report_io.load_summary(), summary)
+
+    # A new history invalidates the summary.
+    report_io.save2(result.rewards_list, result.history.to_frame(), render="lazy")
+    with pytest.raises(FileNotFoundError):
+        report_io.load_summary()
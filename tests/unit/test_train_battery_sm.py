@@ -0,0 +1,65 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from mock import patch
+
+from energy_storage_system import prices
+from energy_storage_system.envs import SimpleBattery
+
+pytest.importorskip("ray")
+
+
+def _import_train_battery_sm():
+    """Import the SageMaker entry point, which is a script rather than a package module."""
+    fname = Path(__file__).parents[2] / "src" / "source_dir" / "train_battery_sm.py"
+    spec = importlib.util.spec_from_file_location("train_battery_sm", fname)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore
+    return module
+
+
+train_battery_sm = _import_train_battery_sm()
+
+
+@patch("sagemaker_rl.ray_launcher.SageMakerRayLauncher.__init__", return_value=None)
+@patch(
+    "sagemaker_rl.ray_launcher.SageMakerRayLauncher.customize_experiment_config",
+    side_effect=lambda config: config,
+)
+def test_customize_experiment_config(customize, launcher_init, env_config):
+    config = {"training": {"config": {"env_config": env_config}}}
+    with patch.object(prices, "load_many", wraps=prices.load_many) as load_many, patch.object(
+        train_battery_sm, "pin_in_object_store", return_value="price-id"
+    ) as pin, patch.object(train_battery_sm, "get_pinned_object") as get_pinned:
+        config = train_battery_sm.MyLauncher().customize_experiment_config(config)
+        env_config = config["training"]["config"]["env_config"]
+        assert env_config["PRICE_DATA_ID"] == "price-id"
+        pin.assert_called_once()
+        df_price = pin.call_args[0][0]
+        assert load_many.call_count == 1
+
+        # Rollout workers attach to the pinned prices, rather than loading their own.
+        get_pinned.return_value = df_price
+        envs = [train_battery_sm.create_env(dict(env_config)) for _ in range(3)]
+        assert load_many.call_count == 1
+        assert get_pinned.call_count == 3
+        get_pinned.assert_called_with("price-id")
+        for env in envs:
+            assert env.df_price is df_price
+
+    pd.testing.assert_frame_equal(df_price, SimpleBattery(dict(env_config)).df_price)
+
+
+@patch.object(train_battery_sm, "get_pinned_object")
+def test_create_env(get_pinned, env_config):
+    # Without pinned prices, the environment loads its own.
+    env = train_battery_sm.create_env(dict(env_config))
+    get_pinned.assert_not_called()
+    assert isinstance(env, SimpleBattery)
+
+
+def test_create_env_obs_buffer(env_config):
+    with pytest.raises(ValueError, match="OBS_BUFFER"):
+        train_battery_sm.create_env(dict(env_config, OBS_BUFFER=True))